@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from metrics import metrics
+from rate_control import TransientError, backoff_delay
+
+
+class TokenBucket:
+    """Async token bucket: on average ``rate`` acquisitions per second, bursts up to ``burst``."""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AdaptiveLimit:
+    """Like asyncio.Semaphore, but the number of slots is read from ``limit()`` on every acquisition."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.active < self.limit())
+            self.active += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+
+async def scrape_all_async(fetch, items, concurrency=8, per_host=None, rate=2.0, burst=1, on_result=None, collect=True,
+                           controller=None, retries=0):
+    """Run the blocking ``fetch(item)`` for all items, several at a time.
+
+    At most ``concurrency`` fetches run at once, and with ``per_host`` at most
+    that many of them against the same host (items that are not URLs, e.g.
+    names, share one slot pool); new fetches start at no more than ``rate``
+    per second.
+    With a ``controller`` (see rate_control.AdaptiveController) rate and
+    concurrency follow its current values instead. A fetch raising
+    rate_control.TransientError is retried up to ``retries`` times after a
+    jittered exponential backoff.
+    Returns the fetch results in input order; ``on_result(item, result)`` is
+    called as soon as each one is available. Pass ``collect=False`` to only
+    stream results to ``on_result`` and keep none of them in memory.
+    """
+    loop = asyncio.get_running_loop()
+    bucket = TokenBucket(rate, burst)
+    overall = AdaptiveLimit(lambda: controller.limit if controller is not None else concurrency)
+    # Without per_host a host may take all of the overall slots
+    hosts = defaultdict(lambda: AdaptiveLimit(lambda: per_host or overall.limit()))
+    results = [None] * len(items) if collect else None
+
+    async def run(index, item):
+        for attempt in range(retries + 1):
+            error = None
+            async with overall, hosts[urlsplit(item).netloc]:
+                if controller is not None:
+                    bucket.rate = controller.rate
+                await bucket.acquire()
+                try:
+                    result = await loop.run_in_executor(executor, fetch, item)
+                except TransientError as e:
+                    error = e
+                    result = None
+                except Exception as e:
+                    logging.error(f"Error scraping {item}: {e}")
+                    result = None
+            if error is None:
+                break
+            # HTTP failures already reached the controller through the session
+            if controller is not None and error.status is None:
+                controller.failure(str(error))
+            if attempt == retries:
+                metrics.count('gave_up')
+                logging.error(f"Giving up on {item} after {attempt + 1} attempts: {error}")
+                break
+            metrics.count('retries')
+            delay = backoff_delay(attempt, retry_after=error.retry_after)
+            logging.warning(f"Transient failure on {item} ({error}), retry {attempt + 1}/{retries} in {delay:.1f}s")
+            if controller is not None:
+                controller.retried()
+            # The slots are free while waiting
+            await asyncio.sleep(delay)
+        if collect:
+            results[index] = result
+        if on_result is not None:
+            on_result(item, result)
+
+    # One thread per slot, also for the most the controller may open up
+    workers = max(concurrency, controller.max_concurrency if controller is not None else 0)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        await asyncio.gather(*(run(index, item) for index, item in enumerate(items)))
+    return results
+
+
+def scrape_all(fetch, items, **kwargs):
+    return asyncio.run(scrape_all_async(fetch, items, **kwargs))
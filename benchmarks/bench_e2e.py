@@ -0,0 +1,212 @@
+"""End-to-end benchmark of the scrapers against the local mock site.
+
+Starts benchmarks/mock_site.py with ``--portraits`` synthetic portraits and
+runs each scenario in a fresh process, reporting pages/sec, p50/p99 latency
+per page (per HTTP response for the main() flows) and the peak RSS of that
+process:
+
+    http        scrape_portrait_http for every portrait URL via scrape_all
+    pipeline    fetch_portrait_html + the process-pool parse stage
+    namelist    scraper_selenium_namelist.main() over a name list
+    listing     get_portrait_links in Firefox (--browser)
+    browser     scrape_portrait in Firefox, one page after the other (--browser)
+    main        scraper_selenium.main(): listing plus all portraits (--browser)
+
+Save results with --save and compare a later run against them with
+--baseline; the exit status is 1 if throughput or memory regressed by more
+than --tolerance.
+
+    python benchmarks/bench_e2e.py --portraits 1000 --save bench_e2e.json
+    python benchmarks/bench_e2e.py --portraits 1000 --baseline bench_e2e.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_site import MockSite
+
+HTTP_SCENARIOS = ['http', 'pipeline', 'namelist']
+BROWSER_SCENARIOS = ['listing', 'browser', 'main']
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def quiet_console():
+    # The scrapers log every page to the console; keep the log file only
+    for handler in logging.getLogger().handlers:
+        if type(handler) is logging.StreamHandler:
+            handler.setLevel(logging.ERROR)
+
+
+def timed(function, latencies):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+    return wrapper
+
+
+def recording_session(get_session, latencies):
+    """get_session replacement that records the latency of every response."""
+    def wrapper(*args, **kwargs):
+        session = get_session(*args, **kwargs)
+        session.hooks['response'].append(lambda response, *a, **k: latencies.append(response.elapsed.total_seconds()))
+        return session
+    return wrapper
+
+
+def run_scenario(scenario, base_url, urls, names_file, options):
+    import scraper_selenium
+    import scraper_selenium_namelist
+    from async_engine import scrape_all
+    from browser_fetch import get_portrait_links, scrape_portrait
+    from http_fetch import fetch_portrait_html, get_session, scrape_portrait_http
+    from pipeline import run_pipeline
+    quiet_console()
+
+    latencies = []
+    pages = len(urls)
+    main_args = ['--base-url', base_url, '--no-cache', '--fixed-rate', '--rate', str(options['rate']),
+                 '--concurrency', str(options['concurrency'])]
+    start = time.perf_counter()
+
+    if scenario == 'http':
+        session = get_session(pool_size=options['concurrency'])
+        scrape_all(timed(lambda url: scrape_portrait_http(session, url), latencies), urls,
+                   concurrency=options['concurrency'], rate=options['rate'], collect=False)
+    elif scenario == 'pipeline':
+        session = get_session(pool_size=options['concurrency'])
+        run_pipeline(timed(lambda url: fetch_portrait_html(session, url), latencies), urls, lambda url, record: None,
+                     concurrency=options['concurrency'], rate=options['rate'])
+    elif scenario == 'namelist':
+        scraper_selenium_namelist.get_session = recording_session(get_session, latencies)
+        scraper_selenium_namelist.main(main_args + ['--names-file', names_file])
+        with open(names_file, 'r', encoding='utf-8') as file:
+            pages = sum(1 for line in file if line.strip())
+    elif scenario == 'listing':
+        driver = scraper_selenium.setup_driver(headless=True, profile='bench')
+        try:
+            links = timed(get_portrait_links, latencies)(driver, f"{base_url}/portraet")
+        finally:
+            driver.quit()
+        pages = len(links)
+    elif scenario == 'browser':
+        urls = urls[:options['browser_pages']]
+        pages = len(urls)
+        driver = scraper_selenium.setup_driver(headless=True, profile='bench')
+        try:
+            scrape = timed(scrape_portrait, latencies)
+            for url in urls:
+                scrape(driver, url)
+        finally:
+            driver.quit()
+    elif scenario == 'main':
+        scraper_selenium.get_session = recording_session(get_session, latencies)
+        scraper_selenium.main(main_args)
+
+    elapsed = time.perf_counter() - start
+    return {
+        'pages': pages,
+        'seconds': round(elapsed, 3),
+        'pages_per_sec': round(pages / elapsed, 2),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        'p99_ms': round(statistics.quantiles(latencies, n=100)[98] * 1000, 2) if len(latencies) > 1 else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def scenario_process(scenario, base_url, urls, names_file, options, results):
+    # Every scenario writes its CSV, journal and indexes to its own directory
+    os.chdir(tempfile.mkdtemp(prefix=f'bench-{scenario}-'))
+    try:
+        results.put(run_scenario(scenario, base_url, urls, names_file, options))
+    except Exception as e:
+        results.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def regressions(results, baseline, tolerance):
+    found = []
+    for scenario, result in results.items():
+        before = baseline.get(scenario)
+        if not before:
+            continue
+        if result['pages_per_sec'] < before['pages_per_sec'] * (1 - tolerance):
+            found.append(f"{scenario}: {before['pages_per_sec']} -> {result['pages_per_sec']} pages/sec")
+        if result['peak_rss_mb'] > before['peak_rss_mb'] * (1 + tolerance):
+            found.append(f"{scenario}: peak RSS {before['peak_rss_mb']} -> {result['peak_rss_mb']} MB")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrapers against a local mock site.")
+    parser.add_argument('--portraits', type=int, default=500, help="Synthetic portraits on the mock site")
+    parser.add_argument('--scenario', action='append', choices=HTTP_SCENARIOS + BROWSER_SCENARIOS,
+                        help="Scenario to run (repeatable; default: all that need no browser)")
+    parser.add_argument('--browser', action='store_true', help="Also run the Firefox scenarios")
+    parser.add_argument('--browser-pages', type=int, default=50, help="Portraits rendered in the browser scenario")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=500.0, help="Request rate limit; high by default to measure the scrapers, not the limit")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds the mock site adds to every response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests the mock site answers with 503")
+    parser.add_argument('--save', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare against results saved with --save")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative regression against the baseline")
+    args = parser.parse_args()
+
+    scenarios = args.scenario or HTTP_SCENARIOS + (BROWSER_SCENARIOS if args.browser else [])
+    options = {'concurrency': args.concurrency, 'rate': args.rate, 'browser_pages': args.browser_pages}
+    context = multiprocessing.get_context('spawn')
+    results = {}
+
+    with MockSite(args.portraits, latency=args.latency, error_rate=args.error_rate) as site:
+        urls = [f"{site.base_url}/portraet/{portrait['slug']}" for portrait in site.portraits]
+        names_file = os.path.join(tempfile.mkdtemp(prefix='bench-names-'), 'names.txt')
+        site.write_names(names_file, missing=len(site.portraits) // 20)
+        print(f"Mock site with {len(site.portraits)} portraits at {site.base_url}")
+        print(f"{'scenario':<10}{'pages':>7}{'pages/sec':>11}{'p50 ms':>9}{'p99 ms':>9}{'RSS MB':>9}")
+        for scenario in scenarios:
+            queue = context.Queue()
+            process = context.Process(target=scenario_process, args=(scenario, site.base_url, urls, names_file, options, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            if 'error' in result:
+                print(f"{scenario:<10}failed: {result['error']}")
+                continue
+            results[scenario] = result
+            print(f"{scenario:<10}{result['pages']:>7}{result['pages_per_sec']:>11}"
+                  f"{result['p50_ms'] if result['p50_ms'] is not None else '-':>9}"
+                  f"{result['p99_ms'] if result['p99_ms'] is not None else '-':>9}{result['peak_rss_mb']:>9}")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as file:
+            json.dump({'portraits': args.portraits, 'results': results}, file, indent=1)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        found = regressions(results, baseline, args.tolerance)
+        for regression in found:
+            print(f"Regression: {regression}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
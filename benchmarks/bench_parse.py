@@ -0,0 +1,87 @@
+"""Parse benchmark: pages/sec of the portrait parser over saved portrait HTML.
+
+Runs the original full-tree ``html.parser`` extraction and the current
+``portrait_parser.parse_portrait_html`` over the same pages, checks that both
+produce identical records and reports the throughput of each.
+
+    python benchmarks/bench_parse.py                  # bundled fixtures
+    python benchmarks/bench_parse.py --cache-dir page_cache
+"""
+import argparse
+import glob
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from page_cache import PageCache
+from portrait_parser import PARSER, parse_portrait_html
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def reference_parse(page_source):
+    # The extraction scrape_portrait used before the targeted parser
+    soup = BeautifulSoup(page_source, 'html.parser')
+    data = {'Name': soup.select_one('h1').text.strip() if soup.select_one('h1') else 'N/A'}
+    table = soup.select_one('tbody')
+    if table:
+        for row in table.select('tr'):
+            th = row.select_one('th')
+            td = row.select_one('td')
+            if th and td:
+                data[th.text.strip()] = td.text.strip()
+    return data
+
+
+def load_pages(args):
+    if args.cache_dir:
+        return [body for _, body in PageCache(args.cache_dir).iter_pages()]
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as file:
+            pages.append(file.read())
+    return pages
+
+
+def measure(parse, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            parse(page)
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the portrait parser.")
+    parser.add_argument('--cache-dir', help="Parse every page in this page cache instead of the fixtures")
+    parser.add_argument('--repeat', type=int, default=50, help="Passes over the page set")
+    args = parser.parse_args()
+    # Keep the "Table not found" warnings of not-found pages out of the timings
+    logging.disable(logging.WARNING)
+
+    pages = load_pages(args)
+    if not pages:
+        print("No pages to parse.")
+        return 1
+
+    mismatches = sum(1 for page in pages if reference_parse(page) != parse_portrait_html(page))
+    repeat = max(1, args.repeat if not args.cache_dir else args.repeat // 10)
+
+    reference = measure(reference_parse, pages, repeat)
+    targeted = measure(parse_portrait_html, pages, repeat)
+
+    print(f"Pages:                {len(pages)} x {repeat}")
+    print(f"Full html.parser:     {reference:10.1f} pages/sec")
+    print(f"{'Targeted (' + PARSER + '):':<22}{targeted:10.1f} pages/sec  ({targeted / reference:.1f}x)")
+    print(f"Mismatching records:  {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""A local stand-in for schlussgang.ch with synthetic portraits.
+
+Serves ``portraits`` generated wrestlers in the markup of the real site:
+``/portraet`` is an infinite-scroll listing that loads further links from
+``/portraet?page=N`` while scrolling, portraits live at ``/portraet/<slug>``
+(every ``zero_every``-th one only at ``<slug>-0``), and every other path gets
+the "Seite nicht gefunden" page. Latency and 503s can be injected to exercise
+the rate controller. With ``next_data`` the pages also carry their data as a
+Next.js ``__NEXT_DATA__`` script and ``/_next/data/<buildId>/...json`` serves
+it on its own, as the JSON source of the scrapers expects.
+
+    python benchmarks/mock_site.py --portraits 2000 --port 8000 --write-names names.txt
+    python scraper_selenium_namelist.py --base-url http://127.0.0.1:8000 --names-file names.txt
+"""
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+FIRST_NAMES = ['Christoph', 'Ivan', 'Simon', 'Remo', 'Fabio', 'Dean', 'Samuel', 'Jürg', 'Matthias', 'Joel',
+               'Pirmin', 'Nick', 'Armon', 'Kilian', 'Curdin', 'Lario', 'Sven', 'Adrian', 'Domenic', 'Michael']
+LAST_NAMES = ['Achermann', 'Ackermann', 'Burch', 'Portmann', 'Wicki', 'Stucki', 'Schlegel', 'Giger', 'Orlik',
+              'Reichmuth', 'Staudenmann', 'Käser', 'Gnägi', 'Aeschbacher', 'Schurtenberger', 'Moser', 'Zgraggen']
+PLACES = ['Willisau', 'Rengg', 'Hasle LU', 'Rothenthurm', 'Attinghausen', 'Entlebuch', 'Mels', 'Uster', 'Thun']
+JOBS = ['Landwirt', 'Zimmermann', 'Maurer', 'Metzger', 'Schreiner', 'Forstwart', 'Landmaschinenmechaniker',
+        'Polymechaniker', 'Elektroinstallateur', 'Käser']
+DRINKS = ['Rivella', 'Wasser', 'Eistee', 'Cola', 'Bier', 'Milch', 'Apfelschorle']
+HOBBYS = ['Schwingen', 'Ski fahren', 'Wandern', 'Jassen', 'Biken', 'Eishockey', 'Fussball', 'Jodeln']
+SIGNS = ['Widder', 'Stier', 'Zwillinge', 'Krebs', 'Löwe', 'Jungfrau', 'Waage', 'Skorpion', 'Schütze',
+         'Steinbock', 'Wassermann', 'Fische']
+
+HEAD = """<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<title>{title} | SCHLUSSGANG</title>
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<link rel="stylesheet" href="/_next/static/css/app.css">
+</head>
+<body>
+<header class="navbar"><a class="navbar-brand" href="/">SCHLUSSGANG</a>
+<ul class="navbar-nav">
+{navigation}
+</ul></header>
+<main class="container">
+"""
+NAVIGATION = '\n'.join(f'<li class="nav-item"><a class="nav-link" href="/rubrik/{i}">Rubrik {i}</a></li>' for i in range(40))
+TEASERS = '<section class="related">\n' + '\n'.join(
+    f'<div class="card teaser"><a href="/news/artikel-{i}">Schwingfest-Bericht {i}</a>'
+    f'<div class="card-body"><p class="card-text">Zusammenfassung des Wettkampfs mit allen Gängen und Resultaten.</p></div></div>'
+    for i in range(12)
+) + '\n</section>\n'
+FOOTER = '</main>\n<footer><ul class="footer-links">\n' + '\n'.join(
+    f'<li><a href="/seite/{i}">Seite {i}</a></li>' for i in range(30)
+) + '\n</ul><p>&copy; SCHLUSSGANG AG</p></footer>\n'
+
+# Appends the next page of links whenever the listing is scrolled to the bottom
+INFINITE_SCROLL = """<script>
+let page = 1, loading = false, done = false;
+window.addEventListener('scroll', () => {
+    if (loading || done || window.innerHeight + window.scrollY < document.body.scrollHeight - 50) {
+        return;
+    }
+    loading = true;
+    fetch('/portraet?page=' + page).then(response => response.text()).then(cards => {
+        if (cards.trim()) {
+            document.getElementById('portraits').insertAdjacentHTML('beforeend', cards);
+            page += 1;
+        } else {
+            done = true;
+        }
+        loading = false;
+    });
+});
+</script>
+"""
+
+
+def slugify(name):
+    return name.strip().lower().replace(' ', '-')
+
+
+def generate_portraits(count, seed=1, zero_every=7):
+    """``count`` reproducible portraits as dicts with first/last name, slug and table rows."""
+    rng = random.Random(seed)
+    portraits = []
+    taken = set()
+    for index in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        while f"{first} {last}" in taken:
+            last += rng.choice('ns')
+        taken.add(f"{first} {last}")
+        slug = slugify(f"{first} {last}")
+        if zero_every and index % zero_every == zero_every - 1:
+            slug += '-0'
+        rows = [
+            ('Geburtsdatum', f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1985, 2008)}"),
+            ('Geschwister', rng.choice(['1 Bruder', '2 Brüder', '1 Schwester', '3 Brüder, 1 Schwester', 'keine'])),
+            ('Gewicht (kg)', str(rng.randint(75, 140))),
+            ('Grösse (cm)', str(rng.randint(170, 200))),
+            ('Hobbys', ', '.join(rng.sample(HOBBYS, rng.randint(1, 3)))),
+            ('Lieblingsgetränk', rng.choice(DRINKS)),
+            ('Schuhgrösse', rng.choice(['43', '44', '45', '46', '47', '45,5', '46/47'])),
+            ('Sternzeichen', rng.choice(SIGNS)),
+            ('Wohnort', rng.choice(PLACES)),
+            ('Zivilstand', rng.choice(['ledig', 'ledig', 'verheiratet'])),
+            ('jetziger Beruf', ' / '.join(rng.sample(JOBS, rng.choice([1, 1, 1, 2])))),
+        ]
+        if rng.random() < 0.5:
+            rows.insert(10, ('erlernter Beruf', rng.choice(JOBS)))
+        portraits.append({'first': first, 'last': last, 'name': f"{last} {first}", 'slug': slug, 'rows': rows})
+    return portraits
+
+
+BUILD_ID = 'mock-build'
+JSON_HEADERS = {'Content-Type': 'application/json; charset=utf-8'}
+# Table label -> key of the page data, in the camelCase of a typical Next.js CMS
+JSON_KEYS = {
+    'Geburtsdatum': 'birthDate', 'Geschwister': 'siblings', 'Gewicht (kg)': 'weight', 'Grösse (cm)': 'height',
+    'Hobbys': 'hobbies', 'Lieblingsgetränk': 'favoriteDrink', 'Schuhgrösse': 'shoeSize', 'Sternzeichen': 'zodiac',
+    'Wohnort': 'residence', 'Zivilstand': 'civilStatus', 'jetziger Beruf': 'currentJob', 'erlernter Beruf': 'learnedJob',
+}
+
+
+def portrait_json(portrait):
+    data = {'firstName': portrait['first'], 'lastName': portrait['last'], 'slug': portrait['slug']}
+    for key, value in portrait['rows']:
+        if key == 'Geburtsdatum':
+            day, month, year = value.split('.')
+            value = f"{year}-{month}-{day}T00:00:00.000Z"
+        elif key in ('Gewicht (kg)', 'Grösse (cm)'):
+            value = int(value)
+        elif key == 'Hobbys':
+            value = value.split(', ')
+        elif key == 'jetziger Beruf':
+            value = value.split(' / ')
+        data[JSON_KEYS[key]] = value
+    return {'pageProps': {'portrait': data, 'related': []}, '__N_SSG': True}
+
+
+def listing_json(portraits, page):
+    return {'pageProps': {'page': page, 'portraits': [
+        {'id': index, 'name': p['name'], 'slug': p['slug']} for index, p in enumerate(portraits)
+    ]}}
+
+
+def next_data_script(page, props):
+    data = {'props': props, 'page': page, 'query': {}, 'buildId': BUILD_ID, 'isFallback': False, 'gsp': True}
+    # Escaped like Next.js does, so no value can close the script element
+    payload = json.dumps(data).replace('<', '\\u003c')
+    return f'<script id="__NEXT_DATA__" type="application/json">{payload}</script>\n'
+
+
+def render_portrait(portrait, next_data=False):
+    rows = ''.join(
+        f'<tr>\n  <th scope="row">{html.escape(key)}</th>\n  <td>{html.escape(value)}</td>\n</tr>\n'
+        for key, value in portrait['rows']
+    )
+    return (
+        HEAD.format(title=html.escape(portrait['name']), navigation=NAVIGATION)
+        + f'<div class="portrait">\n<h1 class="portrait-name">\n  {html.escape(portrait["name"])}\n</h1>\n'
+        + f'<table class="table table-striped portrait-details">\n<tbody>\n{rows}</tbody>\n</table>\n</div>\n'
+        + TEASERS + FOOTER
+        + (next_data_script('/portraet/[slug]', portrait_json(portrait)) if next_data else '')
+        + '</body>\n</html>\n'
+    )
+
+
+def render_not_found():
+    return (
+        HEAD.format(title='Seite nicht gefunden', navigation=NAVIGATION)
+        + '<div class="alert alert-danger" role="alert">Seite nicht gefunden</div>\n'
+        + TEASERS + FOOTER + '</body>\n</html>\n'
+    )
+
+
+def render_cards(portraits):
+    # Every wrestler is linked twice, like on the real listing
+    return ''.join(
+        f'<div class="card portrait-card"><a href="/portraet/{html.escape(p["slug"])}">{html.escape(p["name"])}</a>'
+        f'<a href="/portraet/{html.escape(p["slug"])}">{html.escape(p["name"])} - Portrait</a></div>\n'
+        for p in portraits
+    )
+
+
+def render_listing(portraits, next_data=False):
+    return (
+        HEAD.format(title='Porträt', navigation=NAVIGATION)
+        + f'<div id="portraits">\n{render_cards(portraits)}</div>\n'
+        + FOOTER + INFINITE_SCROLL
+        + (next_data_script('/portraet', listing_json(portraits, 0)) if next_data else '')
+        + '</body>\n</html>\n'
+    )
+
+
+class MockSite:
+    """The mock site on a local port, served from a background thread."""
+
+    def __init__(self, portraits=500, seed=1, zero_every=7, page_size=24, latency=0.0, error_rate=0.0,
+                 soft_404=False, next_data=False, host='127.0.0.1', port=0):
+        self.portraits = generate_portraits(portraits, seed=seed, zero_every=zero_every)
+        self.by_slug = {portrait['slug']: portrait for portrait in self.portraits}
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.soft_404 = soft_404
+        self.next_data = next_data
+        self.not_found = render_not_found().encode('utf-8')
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.random = random.Random(seed)
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def names(self, missing=0):
+        """Names as in namelist_neu.txt ("Vorname Nachname"), plus ``missing`` without a portrait."""
+        names = [f"{portrait['first']} {portrait['last']}" for portrait in self.portraits]
+        return names + [f"Unbekannt Nummer{index}" for index in range(missing)]
+
+    def write_names(self, path, missing=0):
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(self.names(missing)) + '\n')
+
+    def respond(self, path):
+        """``(status, headers, body)`` for a request path."""
+        with self.lock:
+            self.requests += 1
+            failed = self.random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return 503, {'Retry-After': '1'}, b'Service Unavailable'
+
+        parts = urlsplit(path)
+        route = unquote(parts.path).rstrip('/')
+        data_prefix = f'/_next/data/{BUILD_ID}'
+        data_route = self.next_data and route.startswith(data_prefix) and route.endswith('.json')
+        if data_route:
+            route = route[len(data_prefix):-len('.json')]
+        page = int(parse_qs(parts.query).get('page', ['0'])[0])
+        if route == '/portraet':
+            chunk = self.portraits[page * self.page_size:(page + 1) * self.page_size]
+            if data_route:
+                return 200, JSON_HEADERS, json.dumps(listing_json(chunk, page)).encode('utf-8')
+            body = render_listing(chunk, self.next_data) if page == 0 else render_cards(chunk)
+            return 200, {}, body.encode('utf-8')
+        if route.startswith('/portraet/') and route[len('/portraet/'):] in self.by_slug:
+            portrait = self.by_slug[route[len('/portraet/'):]]
+            if data_route:
+                return 200, JSON_HEADERS, json.dumps(portrait_json(portrait)).encode('utf-8')
+            return 200, {}, render_portrait(portrait, self.next_data).encode('utf-8')
+        if data_route:
+            return 404, JSON_HEADERS, b'{"notFound": true}'
+        return (200 if self.soft_404 else 404), {}, self.not_found
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out in separate writes; with Nagle's algorithm
+            # every response on a reused connection would wait for a delayed ACK
+            disable_nagle_algorithm = True
+
+            def _send(self, with_body):
+                status, headers, body = site.respond(self.path)
+                self.send_response(status)
+                headers = {'Content-Type': 'text/html; charset=utf-8', **headers}
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if with_body:
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                self._send(True)
+
+            def do_HEAD(self):
+                self._send(False)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='mock-site', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local mock of schlussgang.ch.")
+    parser.add_argument('--portraits', type=int, default=500, help="Number of synthetic portraits")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--zero-every', type=int, default=7, help="Every N-th portrait only exists as <slug>-0")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument('--soft-404', action='store_true', help="Serve the not-found page with status 200")
+    parser.add_argument('--next-data', action='store_true', help="Also serve the page data as Next.js JSON")
+    parser.add_argument('--write-names', help="Write a name list for scraper_selenium_namelist.py to this file")
+    parser.add_argument('--missing', type=int, default=0, help="Extra names without a portrait in the name list")
+    args = parser.parse_args()
+
+    site = MockSite(args.portraits, seed=args.seed, zero_every=args.zero_every, latency=args.latency,
+                    error_rate=args.error_rate, soft_404=args.soft_404, next_data=args.next_data,
+                    port=args.port)
+    if args.write_names:
+        site.write_names(args.write_names, missing=args.missing)
+    print(f"Serving {len(site.portraits)} portraits at {site.base_url}")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        site.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
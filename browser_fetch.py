@@ -0,0 +1,114 @@
+import logging
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from link_harvester import harvest_portrait_links, links_cache_key, links_to_html
+from metrics import metrics
+from portrait_parser import extract_portrait, parse_portrait_links, read_portrait
+from rate_control import TransientError
+from readiness import Outcome, wait_for_portrait
+
+
+def get_portrait_links(driver, url, cache=None):
+    """Scroll the listing at ``url`` in the browser and return its portrait links."""
+    if cache is not None and cache.offline:
+        cached = cache.load(links_cache_key(url))
+        if cached is None:
+            logging.error(f"Listing {url} is not in the page cache")
+            return []
+        logging.info(f"Replaying listing {url} from page cache")
+        return parse_portrait_links(cached[1])
+    
+    try:
+        logging.info(f"Navigating to {url}")
+        driver.get(url)
+        WebDriverWait(driver, 30).until(
+            EC.presence_of_element_located((By.TAG_NAME, "body"))
+        )
+        logging.info("Page loaded successfully")
+        
+        # Scroll until the listing stops growing, collecting links as they appear
+        portrait_links = harvest_portrait_links(driver)
+        if cache is not None:
+            cache.store(links_cache_key(url), links_to_html(portrait_links))
+        return portrait_links
+    except TimeoutException:
+        logging.error("Timeout waiting for page to load")
+        return []
+    except WebDriverException as e:
+        logging.error(f"WebDriver exception: {e}")
+        return []
+    except Exception as e:
+        logging.error(f"Error in get_portrait_links: {e}")
+        return []
+
+def scrape_portrait(driver, url, cache=None, weights=None):
+    """Render a portrait in the browser and extract its record there."""
+    try:
+        logging.info("Scraping portrait: %s", url)
+        with metrics.timer('navigate'):
+            driver.get(url)
+        
+        # Wait for the table, but give up early on "Seite nicht gefunden",
+        # 404s, redirects to the listing and pages that stay empty
+        with metrics.timer('ready_wait'):
+            outcome, reason = wait_for_portrait(driver, url)
+        if outcome is Outcome.NOT_FOUND:
+            metrics.count('not_found')
+            logging.warning(f"Page not found: {url} ({reason})")
+            return None
+        if outcome is Outcome.TRANSIENT:
+            metrics.count('timeouts')
+            raise TransientError(f"Portrait details not available on {url} ({reason})")
+        
+        data = read_portrait(driver, url, cache=cache)
+        if weights is not None:
+            weights.record(driver, url)
+        
+        logging.info("Successfully scraped data for %s", data.get('Name', 'Unknown'))
+        return data
+    except TransientError:
+        raise
+    except TimeoutException as e:
+        metrics.count('timeouts')
+        raise TransientError(f"Timeout waiting for portrait details on {url}") from e
+    except Exception as e:
+        logging.error(f"Error scraping portrait {url}: {e}")
+        return None
+
+def fetch_portrait_source(driver, url, cache=None, weights=None):
+    """Load a portrait and return its HTML without parsing it (see pipeline.py)."""
+    try:
+        logging.info("Rendering portrait: %s", url)
+        with metrics.timer('navigate'):
+            driver.get(url)
+        
+        with metrics.timer('ready_wait'):
+            outcome, reason = wait_for_portrait(driver, url)
+        if outcome is Outcome.NOT_FOUND:
+            metrics.count('not_found')
+            logging.warning(f"Page not found: {url} ({reason})")
+            return None
+        if outcome is Outcome.TRANSIENT:
+            metrics.count('timeouts')
+            raise TransientError(f"Portrait details not available on {url} ({reason})")
+        
+        # The compact heading+table snapshot is all the parse stage needs
+        with metrics.timer('page_source'):
+            extracted = extract_portrait(driver, with_html=True)
+            page_source = extracted[1] if extracted is not None else driver.page_source
+        if cache is not None:
+            cache.store(url, page_source)
+        if weights is not None:
+            weights.record(driver, url)
+        return page_source
+    except TransientError:
+        raise
+    except TimeoutException as e:
+        metrics.count('timeouts')
+        raise TransientError(f"Timeout rendering portrait {url}") from e
+    except Exception as e:
+        logging.error(f"Error rendering portrait {url}: {e}")
+        return None
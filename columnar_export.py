@@ -0,0 +1,82 @@
+import csv
+import logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+from portrait_record import parse_date, parse_number
+
+# Columns with a type of their own; everything else is stored as string
+NUMERIC_COLUMNS = ['Grösse (cm)', 'Gewicht (kg)', 'Schuhgrösse']
+DATE_COLUMNS = ['Geburtsdatum']
+
+def available():
+    return pa is not None
+
+
+def column_type(name):
+    if name in NUMERIC_COLUMNS:
+        return pa.float64()
+    if name in DATE_COLUMNS:
+        return pa.date32()
+    return pa.string()
+
+
+def convert(name, values):
+    if name in NUMERIC_COLUMNS:
+        return [parse_number(value) for value in values]
+    if name in DATE_COLUMNS:
+        return [parse_date(value) for value in values]
+    return [value or None for value in values]
+
+
+def csv_to_parquet(csv_path, path):
+    """Write the scraper's CSV as a typed columnar file.
+
+    ``.arrow``/``.feather`` paths get an uncompressed Arrow IPC file, which
+    can be memory-mapped without copying; anything else is written as Parquet.
+    Values that do not fit a column's type become nulls, so a stray entry
+    never turns a numeric column back into text.
+    """
+    with open(csv_path, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file)
+        header = next(reader)
+        columns = [[] for _ in header]
+        for row in reader:
+            for position, column in enumerate(columns):
+                column.append(row[position] if position < len(row) else '')
+
+    converted = {}
+    for name, values in zip(header, columns):
+        converted[name] = convert(name, values)
+        dropped = sum(1 for raw, value in zip(values, converted[name]) if raw and value is None)
+        if dropped:
+            logging.warning(f"{dropped} values of '{name}' are not a {column_type(name)} and were left empty")
+    table = pa.table(converted, schema=pa.schema([(name, column_type(name)) for name in header]))
+
+    if path.endswith(('.arrow', '.feather')):
+        pyarrow.feather.write_feather(table, path, compression='uncompressed')
+    else:
+        pyarrow.parquet.write_table(table, path)
+    logging.info(f"Typed columnar copy of {len(table)} portraits saved to {path}")
+
+
+def load_columns(path, columns=None):
+    """Load ``columns`` (all by default) of a columnar file memory-mapped into a DataFrame.
+
+    Columns missing from older snapshots are skipped.
+    """
+    if path.endswith(('.arrow', '.feather')):
+        # Arrow IPC: the table is a view of the mapped file, selecting copies nothing
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        if columns is not None:
+            table = table.select([name for name in columns if name in table.column_names])
+    else:
+        parquet_file = pyarrow.parquet.ParquetFile(path, memory_map=True)
+        names = parquet_file.schema_arrow.names
+        table = parquet_file.read(columns=None if columns is None else [name for name in columns if name in names])
+    return table.to_pandas(date_as_object=False)
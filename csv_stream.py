@@ -0,0 +1,80 @@
+import csv
+import logging
+import os
+import tempfile
+import threading
+
+
+class StreamingCSVWriter:
+    """Write records to CSV as they arrive, without keeping them in memory.
+
+    Columns are appended in order of first appearance, so rows written before
+    a new column showed up are simply shorter. ``close()`` then rewrites the
+    file once, streaming row by row, with the full header and the final
+    column order (``Name`` first, the rest sorted, when ``sort_columns`` is set).
+    """
+
+    def __init__(self, filename, sort_columns=True):
+        self.filename = filename
+        self.sort_columns = sort_columns
+        self.columns = []
+        self.header = []
+        self.rows = 0
+        self.lock = threading.Lock()
+        self.file = open(filename, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+
+    def write(self, record):
+        with self.lock:
+            for key in record:
+                if key not in self.columns:
+                    self.columns.append(key)
+            if not self.header:
+                self.header = list(self.columns)
+                self.writer.writerow(self.header)
+            row = [record.get(key, '') for key in self.columns]
+            # Trailing empty values are left out, like missing trailing columns
+            while row and row[-1] == '':
+                row.pop()
+            self.writer.writerow(row)
+            self.file.flush()
+            self.rows += 1
+
+    def final_columns(self):
+        if not self.sort_columns:
+            return list(self.columns)
+        rest = sorted(key for key in self.columns if key != 'Name')
+        return ['Name'] + rest if 'Name' in self.columns else rest
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+            if not self.rows:
+                logging.warning("No data to save")
+                return
+            columns = self.final_columns()
+            if columns != self.header:
+                self._compact(columns)
+            logging.info(f"Data saved to {self.filename}")
+            logging.debug(f"CSV columns: {columns}")
+
+    def _compact(self, columns):
+        positions = [self.columns.index(key) for key in columns]
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.csv.tmp')
+        with open(self.filename, 'r', newline='', encoding='utf-8') as source, \
+                os.fdopen(fd, 'w', newline='', encoding='utf-8') as target:
+            reader = csv.reader(source)
+            writer = csv.writer(target)
+            next(reader)
+            writer.writerow(columns)
+            for row in reader:
+                writer.writerow([row[position] if position < len(row) else '' for position in positions])
+        os.replace(tmp_path, self.filename)
+        logging.debug(f"Rewrote {self.filename} with {len(columns)} columns")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
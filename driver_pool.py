@@ -0,0 +1,125 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from rate_control import TransientError
+
+
+class DriverPool:
+    """A fixed number of worker threads, each owning its own WebDriver.
+
+    Workers pull URLs from one shared queue and run ``scrape_portrait(driver, url)``;
+    ``setup_driver(index)`` gets the worker's index, e.g. to pick its own profile.
+    A worker replaces its driver after ``max_pages`` pages and as soon as a
+    failed page turns out to have a dead browser behind it. Pages lost to a
+    dead or unstartable browser raise rate_control.TransientError, so the
+    caller can retry them. Drivers are started lazily, so an idle pool costs
+    no browsers.
+    """
+
+    def __init__(self, setup_driver, scrape_portrait, size=2, max_pages=200):
+        self.setup_driver = setup_driver
+        self.scrape_portrait = scrape_portrait
+        self.size = size
+        self.max_pages = max_pages
+        self.tasks = queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def _start(self):
+        with self.lock:
+            if self.workers:
+                return
+            for index in range(self.size):
+                worker = threading.Thread(target=self._work, args=(index,), name=f"driver-{index}", daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+    def _work(self, index):
+        driver = None
+        pages = 0
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            url, future = task
+
+            if driver is not None and pages >= self.max_pages:
+                logging.info(f"Recycling driver {index} after {pages} pages")
+                self._quit(driver)
+                driver = None
+            if driver is None:
+                driver = self.setup_driver(index)
+                pages = 0
+                if not driver:
+                    logging.error(f"Driver {index} konnte nicht gestartet werden, überspringe {url}")
+                    future.set_exception(TransientError(f"Driver {index} could not be started for {url}"))
+                    continue
+
+            error = None
+            try:
+                result = self.scrape_portrait(driver, url)
+            except TransientError as e:
+                # Passed on to the caller, which decides about retrying
+                error = e
+                result = None
+            except Exception as e:
+                logging.error(f"Error in driver {index} on {url}: {e}")
+                result = None
+            pages += 1
+            # scrape_portrait swallows its own errors, so a failed page is
+            # followed by a cheap round-trip to tell a dead browser from a bad page
+            if result is None and not self._alive(driver):
+                logging.warning(f"Driver {index} died on {url}, restarting it")
+                self._quit(driver)
+                driver = None
+                if error is None:
+                    error = TransientError(f"Driver {index} died while scraping {url}")
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        if driver is not None:
+            self._quit(driver)
+
+    def _alive(self, driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            # A crashed geckodriver surfaces as a urllib3 connection error
+            return False
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"Error quitting driver: {e}")
+
+    def submit(self, url):
+        self._start()
+        future = Future()
+        self.tasks.put((url, future))
+        return future
+
+    def scrape(self, url):
+        return self.submit(url).result()
+
+    def map(self, urls):
+        futures = [self.submit(url) for url in urls]
+        return [future.result() for future in futures]
+
+    def close(self):
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,120 @@
+import logging
+import re
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import metrics
+from portrait_parser import parse_portrait_html
+from rate_control import TransientError, retry_after_seconds
+from readiness import NOT_FOUND_TEXT
+
+TBODY_TAG = re.compile(r'<tbody[\s>]', re.IGNORECASE)
+
+
+def get_session(pool_size=10):
+    session = requests.Session()
+    session.headers.update({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7',
+        'Referer': 'https://www.schlussgang.ch/portraet',
+        'DNT': '1',
+        'Connection': 'keep-alive',
+    })
+    # Keep-alive connections are pooled per host, so every portrait after the
+    # first one reuses an open TLS connection to schlussgang.ch
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def fetch_portrait_page(session, url, timeout=15, cache=None):
+    """Return the static HTML of a portrait page, or None if it could not be fetched.
+
+    With a ``cache`` (see page_cache.PageCache) pages are read through it.
+    Timeouts, dropped connections and 429/5xx responses raise
+    rate_control.TransientError so the caller can retry them.
+    """
+    try:
+        logging.info("Fetching portrait: %s", url)
+        with metrics.timer('fetch'):
+            if cache is not None:
+                response = cache.fetch(session, url, timeout=timeout)
+                if response is None:
+                    return None
+            else:
+                response = session.get(url, timeout=timeout)
+    except (requests.Timeout, requests.ConnectionError) as e:
+        metrics.count('timeouts' if isinstance(e, requests.Timeout) else 'connection_errors')
+        raise TransientError(f"{type(e).__name__} fetching {url}") from e
+    except requests.RequestException as e:
+        metrics.count('errors')
+        logging.error(f"Error fetching portrait {url}: {e}")
+        return None
+    if getattr(response, 'from_cache', False):
+        metrics.count('cache_hits')
+    if response.status_code == 404:
+        metrics.count('not_found')
+        logging.warning(f"Page not found: {url}")
+        return None
+    if response.status_code == 429 or response.status_code >= 500:
+        metrics.count(f'http_{response.status_code}')
+        raise TransientError(
+            f"HTTP {response.status_code} from {url}",
+            status=response.status_code,
+            retry_after=retry_after_seconds(response),
+        )
+    if response.status_code >= 400:
+        metrics.count('errors')
+        logging.error(f"Error fetching portrait {url}: HTTP {response.status_code}")
+        return None
+    page = response.text
+    if NOT_FOUND_TEXT in page and not TBODY_TAG.search(page):
+        # The not-found page, served with status 200
+        metrics.count('not_found')
+        logging.warning(f"Page not found: {url}")
+        return None
+    return page
+
+
+def scrape_portrait_http(session, url, fallback=None, timeout=15, cache=None):
+    """Scrape a portrait from its static HTML.
+
+    ``fallback`` is called with the URL when the static HTML has no portrait
+    table, typically to render the page with a WebDriver instead.
+    """
+    page = fetch_portrait_page(session, url, timeout=timeout, cache=cache)
+    if page is None:
+        return None
+
+    with metrics.timer('parse'):
+        data = parse_portrait_html(page, require_table=True)
+    if data is not None:
+        logging.info("Successfully scraped data for %s", data.get('Name', 'Unknown'))
+        return data
+
+    if fallback is None:
+        logging.warning(f"Table not found in static HTML of {url}")
+        return None
+    logging.info("Table not found in static HTML of %s, falling back to WebDriver", url)
+    return fallback(url)
+
+
+def fetch_portrait_html(session, url, fallback=None, timeout=15, cache=None):
+    """Like scrape_portrait_http, but return the raw HTML for a separate parse stage.
+
+    Whether the static HTML has a table is decided by a cheap tag search, so
+    this stage does no parsing; ``fallback`` returns the HTML of a rendered page.
+    """
+    page = fetch_portrait_page(session, url, timeout=timeout, cache=cache)
+    if page is None:
+        return None
+    if TBODY_TAG.search(page):
+        return page
+
+    if fallback is None:
+        logging.warning(f"Table not found in static HTML of {url}")
+        return None
+    logging.info("Table not found in static HTML of %s, falling back to WebDriver", url)
+    return fallback(url)
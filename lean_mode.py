@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+import threading
+from urllib.parse import quote
+
+# Portrait pages only need their HTML and scripts; images, media and web fonts
+# are never loaded in lean mode
+LEAN_PREFERENCES = {
+    'permissions.default.image': 2,
+    'gfx.downloadable_fonts.enabled': False,
+    'browser.display.use_document_fonts': 0,
+    'media.autoplay.default': 5,
+    'media.autoplay.blocking_policy': 2,
+    'media.preload.default': 0,
+    'media.preload.auto': 0,
+    'network.prefetch-next': False,
+    'network.dns.disablePrefetch': True,
+    'network.http.speculative-parallel-limit': 0,
+}
+
+# Resource Timing of the current page: requests made and bytes transferred
+PAGE_WEIGHT_SCRIPT = """
+const entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+return [entries.length, entries.reduce((total, entry) => total + (entry.transferSize || 0), 0)];
+"""
+
+
+def pac_script(allowed_hosts):
+    """A proxy auto-config that lets only ``allowed_hosts`` (and their subdomains) through.
+
+    Every other request is sent to a closed local port and fails at once.
+    """
+    checks = ' || '.join(f'host == "{host}" || dnsDomainIs(host, ".{host}")' for host in allowed_hosts)
+    return (
+        'function FindProxyForURL(url, host) {\n'
+        f'    if ({checks}) {{ return "DIRECT"; }}\n'
+        '    return "PROXY 127.0.0.1:9";\n'
+        '}\n'
+    )
+
+
+def apply_lean_options(firefox_options, allowed_hosts=None):
+    for name, value in LEAN_PREFERENCES.items():
+        firefox_options.set_preference(name, value)
+    # Return from driver.get at DOMContentLoaded instead of waiting for every subresource
+    firefox_options.page_load_strategy = 'eager'
+    if allowed_hosts:
+        firefox_options.set_preference('network.proxy.type', 2)
+        firefox_options.set_preference(
+            'network.proxy.autoconfig_url',
+            'data:application/x-ns-proxy-autoconfig,' + quote(pac_script(allowed_hosts)),
+        )
+
+
+class PageWeightTracker:
+    """Requests and bytes per browser-rendered page, compared with a baseline.
+
+    A run without lean mode saves its averages as the baseline file; lean runs
+    then report what they save per page against it.
+    """
+
+    def __init__(self, baseline_path='page_weight_baseline.json', lean=False):
+        self.baseline_path = baseline_path
+        self.lean = lean
+        self.pages = 0
+        self.requests = 0
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.baseline = None
+        if lean and os.path.exists(baseline_path):
+            with open(baseline_path, 'r', encoding='utf-8') as file:
+                self.baseline = json.load(file)
+
+    def record(self, driver, url):
+        try:
+            requests, transferred = driver.execute_script(PAGE_WEIGHT_SCRIPT)
+        except Exception as e:
+            logging.debug(f"Could not read page weight of {url}: {e}")
+            return
+        with self.lock:
+            self.pages += 1
+            self.requests += requests
+            self.bytes += transferred
+        if self.baseline:
+            logging.debug(
+                f"Page weight of {url}: {requests} requests, {transferred / 1024:.0f} KB "
+                f"(saved {self.baseline['requests'] - requests:.0f} requests, "
+                f"{(self.baseline['bytes'] - transferred) / 1024:.0f} KB)"
+            )
+        else:
+            logging.debug("Page weight of %s: %d requests, %.0f KB", url, requests, transferred / 1024)
+
+    def report(self):
+        if not self.pages:
+            return
+        average = {'requests': self.requests / self.pages, 'bytes': self.bytes / self.pages}
+        message = (
+            f"Browser pages: {self.pages}, on average {average['requests']:.1f} requests "
+            f"and {average['bytes'] / 1024:.0f} KB per page"
+        )
+        if self.lean and self.baseline:
+            message += (
+                f", saving {self.baseline['requests'] - average['requests']:.1f} requests "
+                f"and {(self.baseline['bytes'] - average['bytes']) / 1024:.0f} KB per page"
+            )
+        logging.info(message)
+        if not self.lean:
+            with open(self.baseline_path, 'w', encoding='utf-8') as file:
+                json.dump(average, file)
+            logging.info(f"Page weight baseline saved to {self.baseline_path}")
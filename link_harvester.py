@@ -0,0 +1,68 @@
+import html
+import logging
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+
+COUNT_LINKS_SCRIPT = "return document.querySelectorAll(\"a[href*='portraet']\").length;"
+
+# Anchors are only ever appended by the infinite scroll, so every round only
+# transfers the ones after the last known count
+COLLECT_LINKS_SCRIPT = """
+return Array.from(document.querySelectorAll("a[href*='portraet']"))
+    .slice(arguments[0])
+    .map(link => link.getAttribute('href'));
+"""
+
+
+def harvest_portrait_links(driver, poll_timeout=3, poll_frequency=0.2):
+    """Scroll the portrait listing and collect the unique portrait links.
+
+    After each scroll the anchor count is polled for up to ``poll_timeout``
+    seconds; new links are added to an ordered set right away. Harvesting
+    stops as soon as a scroll brings no new links.
+    """
+    links = {}
+    seen = 0
+
+    def collect():
+        nonlocal seen
+        hrefs = driver.execute_script(COLLECT_LINKS_SCRIPT, seen)
+        seen += len(hrefs)
+        new = 0
+        for href in hrefs:
+            if href and href != '/portraet' and href not in links:
+                links[href] = None
+                new += 1
+        return new
+
+    collect()
+    rounds = 0
+    while True:
+        rounds += 1
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        try:
+            WebDriverWait(driver, poll_timeout, poll_frequency=poll_frequency).until(
+                lambda d: d.execute_script(COUNT_LINKS_SCRIPT) > seen
+            )
+        except TimeoutException:
+            break
+        if not collect():
+            break
+        logging.debug(f"Scroll {rounds}: {len(links)} portrait links")
+
+    logging.info(f"Harvested {len(links)} unique portrait links in {rounds} scrolls")
+    return list(links)
+
+
+def links_cache_key(listing_url):
+    """Page cache key of the links harvested from a listing.
+
+    The harvested list is not the listing page itself, so it must not be
+    stored under the listing URL, where it would shadow the real page.
+    """
+    return f"{listing_url}#links"
+
+
+def links_to_html(links):
+    """A minimal listing page that parse_portrait_links reads back as ``links``."""
+    return ''.join(f'<a href="{html.escape(link)}"></a>\n' for link in links)
@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from a cache hit to a browser giving up
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class StageHistogram:
+    """Durations of one stage in cumulative buckets, as Prometheus histograms count them."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        for index, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (None above the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return None
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), self.counts)},
+        }
+
+
+class Metrics:
+    """Per-stage timings and event counters of a scrape run.
+
+    Stages are timed with ``with metrics.timer('navigate'):`` (or ``observe``),
+    events counted with ``count('not_found')``. Both are cheap enough for
+    every page and safe to use from all worker threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters = Counter()
+        self.stages = {}
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = StageHistogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'uptime_seconds': round(time.time() - self.started, 1),
+                'counters': dict(self.counters),
+                'stages': {stage: histogram.to_dict() for stage, histogram in self.stages.items()},
+            }
+
+    def to_prometheus(self, prefix='schlussgang'):
+        lines = []
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+            if self.stages:
+                lines.append(f"# TYPE {prefix}_stage_seconds histogram")
+            for stage, histogram in sorted(self.stages.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the JSON snapshot to ``path`` and the Prometheus text next to it (``.prom``)."""
+        _write_atomic(path, json.dumps(self.snapshot(), indent=1))
+        _write_atomic(os.path.splitext(path)[0] + '.prom', self.to_prometheus())
+
+    def summary(self):
+        snapshot = self.snapshot()
+        stages = ', '.join(
+            f"{stage} {data['sum']:.0f}s (n={data['count']}, p50<={data['p50']}s)"
+            for stage, data in sorted(snapshot['stages'].items(), key=lambda entry: -entry[1]['sum'])
+        )
+        counters = ', '.join(f"{name}={value}" for name, value in sorted(snapshot['counters'].items()))
+        return f"Time per stage: {stages or '-'}; events: {counters or '-'}"
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+class MetricsReporter:
+    """Writes snapshots of ``metrics`` to ``path`` every ``interval`` seconds and once at ``stop()``."""
+
+    def __init__(self, metrics, path, interval=60):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='metrics', daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.metrics.write(self.path)
+            logging.info(self.metrics.summary())
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.metrics.write(self.path)
+        logging.info(self.metrics.summary())
+        logging.info(f"Metrics saved to {self.path}")
+
+
+# Shared by all modules of a scrape run
+metrics = Metrics()
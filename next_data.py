@@ -0,0 +1,254 @@
+import json
+import logging
+import re
+import threading
+from datetime import date
+from urllib.parse import urlsplit
+
+from http_fetch import fetch_portrait_page
+from link_harvester import links_cache_key, links_to_html
+from metrics import metrics
+from portrait_parser import parse_portrait_html
+
+NEXT_DATA_SCRIPT = re.compile(
+    r'<script[^>]*\bid=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL
+)
+ISO_DATE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})')
+
+# Keys of the page data (lower case, without separators) -> label in the portrait table
+FIELD_ALIASES = {
+    'Wohnort': ['wohnort', 'residence', 'hometown', 'city', 'place'],
+    'Geburtsdatum': ['geburtsdatum', 'birthdate', 'dateofbirth', 'birthday', 'born'],
+    'Zivilstand': ['zivilstand', 'civilstatus', 'maritalstatus'],
+    'Kinder': ['kinder', 'children'],
+    'Geschwister': ['geschwister', 'siblings'],
+    'Grösse (cm)': ['groesse', 'grosse', 'grösse', 'groessecm', 'grössecm', 'height', 'heightcm'],
+    'Gewicht (kg)': ['gewicht', 'gewichtkg', 'weight', 'weightkg'],
+    'Schuhgrösse': ['schuhgroesse', 'schuhgrosse', 'schuhgrösse', 'shoesize'],
+    'Hobbys': ['hobbys', 'hobbies', 'hobby'],
+    'erlernter Beruf': ['erlernterberuf', 'learnedjob', 'learnedprofession', 'apprenticeship'],
+    'jetziger Beruf': ['jetzigerberuf', 'currentjob', 'currentprofession', 'job', 'profession', 'beruf'],
+    'Lieblingsgericht': ['lieblingsgericht', 'favoritefood', 'favouritefood', 'favoritedish'],
+    'Lieblingsgetränk': ['lieblingsgetraenk', 'lieblingsgetränk', 'favoritedrink', 'favouritedrink'],
+    'Sternzeichen': ['sternzeichen', 'zodiac', 'zodiacsign', 'starsign'],
+}
+LABELS = {alias: label for label, aliases in FIELD_ALIASES.items() for alias in aliases}
+NAME_KEYS = ['name', 'fullname', 'title']
+# Lists are joined the way the table writes them
+LIST_SEPARATORS = {'jetziger Beruf': ' / ', 'erlernter Beruf': ' / '}
+# A dict needs this many known fields to count as a portrait
+MIN_FIELDS = 3
+
+
+def _normalize(key):
+    return re.sub(r'[^0-9a-zäöü]', '', key.lower())
+
+
+def extract_next_data(page_source):
+    """The JSON of a page's ``__NEXT_DATA__`` script, or None."""
+    match = NEXT_DATA_SCRIPT.search(page_source)
+    if match is None:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        logging.warning("Unreadable __NEXT_DATA__ script")
+        return None
+
+
+def _text(label, value):
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        parts = [_text(label, item) for item in value]
+        return LIST_SEPARATORS.get(label, ', ').join(part for part in parts if part) or None
+    if isinstance(value, dict):
+        return _text(label, value.get('name', value.get('value', value.get('title'))))
+    if isinstance(value, float):
+        value = int(value) if value.is_integer() else str(value).replace('.', ',')
+    value = str(value).strip()
+    if label == 'Geburtsdatum':
+        match = ISO_DATE.match(value)
+        if match:
+            value = date(*map(int, match.groups())).strftime('%d.%m.%Y')
+    return value or None
+
+
+def _rows(entries):
+    """``[{'label': ..., 'value': ...}, ...]`` lists, as some CMS deliver tables."""
+    rows = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            return None
+        key = entry.get('label', entry.get('key', entry.get('title')))
+        if not isinstance(key, str) or 'value' not in entry:
+            return None
+        rows[key.strip()] = entry['value']
+    return rows
+
+
+def portrait_from_json(candidate):
+    """Map one dict of page data to a record with the field names of the portrait table."""
+    fields = {_normalize(key): value for key, value in candidate.items() if isinstance(key, str)}
+    record = {}
+    for key, value in fields.items():
+        label = LABELS.get(key)
+        if label is not None and label not in record:
+            text = _text(label, value)
+            if text is not None:
+                record[label] = text
+    for value in candidate.values():
+        rows = _rows(value) if isinstance(value, list) and value else None
+        for key, row_value in (rows or {}).items():
+            text = _text(key, row_value)
+            if text is not None:
+                record.setdefault(LABELS.get(_normalize(key), key), text)
+    if len(record) < MIN_FIELDS:
+        return None
+
+    name = next((fields[key] for key in NAME_KEYS if isinstance(fields.get(key), str)), None)
+    if name is None and isinstance(fields.get('firstname'), str) and isinstance(fields.get('lastname'), str):
+        # The portrait heading reads "Nachname Vorname"
+        name = f"{fields['lastname']} {fields['firstname']}"
+    return {'Name': name.strip() if name else 'N/A', **record}
+
+
+def _walk(node):
+    yield node
+    children = node.values() if isinstance(node, dict) else node if isinstance(node, list) else ()
+    for child in children:
+        if isinstance(child, (dict, list)):
+            yield from _walk(child)
+
+
+def find_portrait(page_props):
+    """The portrait in a page's data: the dict with the most table fields."""
+    best = None
+    for node in _walk(page_props):
+        if isinstance(node, dict):
+            record = portrait_from_json(node)
+            if record is not None and (best is None or len(record) > len(best)):
+                best = record
+    return best
+
+
+def _link(entry):
+    for key in ('href', 'url', 'path', 'link'):
+        value = entry.get(key)
+        if isinstance(value, str) and '/portraet/' in value:
+            return urlsplit(value).path
+    slug = entry.get('slug')
+    if isinstance(slug, str) and slug:
+        return slug if slug.startswith('/portraet/') else f"/portraet/{slug.strip('/').split('/')[-1]}"
+    return None
+
+
+def find_portrait_links(page_props):
+    """Portrait links of the longest list of linked entries in a page's data."""
+    best = []
+    for node in _walk(page_props):
+        if isinstance(node, list) and len(node) > len(best):
+            links = [_link(entry) for entry in node if isinstance(entry, dict)]
+            links = [link for link in links if link]
+            if len(links) > len(best):
+                best = links
+    return list(dict.fromkeys(best))
+
+
+class NextDataSource:
+    """Portraits and the listing read from the site's Next.js page data.
+
+    Next.js sites embed each page's data as JSON in a ``__NEXT_DATA__``
+    script and serve it on its own at ``/_next/data/<buildId>/<path>.json``.
+    The build id is read from the first page that has the script. The
+    listing is then paged through the data route instead of scrolling, and
+    portraits come straight from their JSON without HTML parsing. Whatever
+    has no JSON falls back to the static HTML table and then ``fallback``.
+    """
+
+    def __init__(self, session, base_url, cache=None, max_listing_pages=200):
+        self.session = session
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache
+        self.max_listing_pages = max_listing_pages
+        self.build_id = None
+        self.lock = threading.Lock()
+
+    def _learn(self, next_data):
+        build_id = next_data.get('buildId')
+        if build_id and build_id != self.build_id:
+            with self.lock:
+                self.build_id = build_id
+            logging.info(f"Next.js build id: {build_id}")
+
+    def _data_url(self, path, query=''):
+        return f"{self.base_url}/_next/data/{self.build_id}{path}.json{query}"
+
+    def _page_props(self, url, session=None):
+        """``pageProps`` of a data route, or None if there is none."""
+        text = fetch_portrait_page(session or self.session, url, cache=self.cache)
+        if text is None:
+            return None
+        try:
+            return json.loads(text).get('pageProps')
+        except (ValueError, AttributeError):
+            return None
+
+    def get_portrait_links(self):
+        """All portrait links of the listing, or an empty list if the listing has no page data."""
+        listing_url = f"{self.base_url}/portraet"
+        page = fetch_portrait_page(self.session, listing_url, cache=self.cache)
+        next_data = extract_next_data(page) if page else None
+        if next_data is None:
+            logging.info("The listing has no __NEXT_DATA__")
+            return []
+        self._learn(next_data)
+        links = find_portrait_links(next_data.get('props', {}).get('pageProps', {}))
+        requests = 1
+        # Further pages of the infinite scroll, as JSON
+        for number in range(1, self.max_listing_pages):
+            if not self.build_id or not links:
+                break
+            page_props = self._page_props(self._data_url('/portraet', f'?page={number}'))
+            requests += 1
+            new = [link for link in find_portrait_links(page_props or {}) if link not in links]
+            if not new:
+                break
+            links.extend(new)
+        logging.info(f"Read {len(links)} portrait links from the page data in {requests} requests")
+        if self.cache is not None and not self.cache.offline:
+            # Lets an --offline replay of the scrolled listing see every link, too
+            self.cache.store(links_cache_key(listing_url), links_to_html(links))
+        return links
+
+    def scrape_portrait(self, session, url, fallback=None, timeout=15, cache=None):
+        """Like http_fetch.scrape_portrait_http, but from the page data where there is any."""
+        if self.build_id:
+            page_props = self._page_props(self._data_url(urlsplit(url).path), session)
+            record = find_portrait(page_props) if page_props else None
+            if record is not None:
+                metrics.count('json_records')
+                return record
+
+        # No data route (yet), an outdated build id or no such portrait
+        page = fetch_portrait_page(session, url, timeout=timeout, cache=cache)
+        if page is None:
+            return None
+        next_data = extract_next_data(page)
+        if next_data is not None:
+            self._learn(next_data)
+            record = find_portrait(next_data.get('props', {}).get('pageProps', {}))
+            if record is not None:
+                metrics.count('json_records')
+                return record
+
+        metrics.count('json_fallbacks')
+        with metrics.timer('parse'):
+            data = parse_portrait_html(page, require_table=True)
+        if data is not None:
+            return data
+        if fallback is None:
+            logging.warning(f"Neither page data nor a table on {url}")
+            return None
+        logging.info("Neither page data nor a table on %s, falling back to WebDriver", url)
+        return fallback(url)
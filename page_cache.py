@@ -0,0 +1,170 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+CachedPage = namedtuple('CachedPage', ['status_code', 'text', 'from_cache', 'headers'])
+
+
+class PageCache:
+    """On-disk page cache keyed by the SHA-256 of the URL.
+
+    Each entry is a ``<key>.html`` body plus a ``<key>.json`` sidecar holding
+    the URL, ETag, Last-Modified and fetch time. Entries younger than ``ttl``
+    seconds are served without touching the network; older ones are
+    revalidated with a conditional request. Once the bodies exceed
+    ``max_bytes``, the least recently used entries are evicted; their order
+    is read from the bodies' mtimes once at startup and kept in memory. In
+    ``offline`` mode only cached pages are returned.
+    """
+
+    def __init__(self, directory='page_cache', max_bytes=500 * 1024 * 1024, ttl=24 * 3600, offline=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.offline = offline
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # body path -> size, least recently used first
+        self.entries = OrderedDict()
+        stats = [(path, os.stat(path)) for path, _ in self._bodies()]
+        for body_path, stat in sorted(stats, key=lambda entry: entry[1].st_mtime):
+            self.entries[body_path] = stat.st_size
+        self.total_bytes = sum(self.entries.values())
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        prefix = os.path.join(self.directory, key[:2], key)
+        return prefix + '.html', prefix + '.json'
+
+    def _bodies(self):
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.endswith('.html'):
+                    path = os.path.join(root, filename)
+                    yield path, path[:-len('.html')] + '.json'
+
+    def _write(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+    def load(self, url):
+        """Return ``(meta, body)`` for a cached URL, or None."""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as file:
+                meta = json.load(file)
+            with open(body_path, 'r', encoding='utf-8') as file:
+                body = file.read()
+        except (OSError, ValueError):
+            return None
+        with self.lock:
+            if body_path in self.entries:
+                self.entries.move_to_end(body_path)
+        # The body's mtime keeps the LRU order for the next run
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+        return meta, body
+
+    def store(self, url, body, etag=None, last_modified=None):
+        body_path, meta_path = self._paths(url)
+        with self.lock:
+            self.total_bytes -= self.entries.pop(body_path, 0)
+            self._write(body_path, body)
+            self._write(meta_path, json.dumps({
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'fetched_at': time.time(),
+            }))
+            self.entries[body_path] = os.path.getsize(body_path)
+            self.total_bytes += self.entries[body_path]
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _touch_meta(self, url, meta):
+        meta['fetched_at'] = time.time()
+        self._write(self._paths(url)[1], json.dumps(meta))
+
+    def _evict(self):
+        # The entry just stored is the most recent one and goes last
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            body_path, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            meta_path = body_path[:-len('.html')] + '.json'
+            for path in (body_path, meta_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            logging.debug("Evicted %s from page cache", body_path)
+
+    def fetch(self, session, url, timeout=15):
+        """Fetch ``url`` through the cache.
+
+        Returns a CachedPage, or None in offline mode when the URL is not cached.
+        """
+        cached = self.load(url)
+        if self.offline:
+            if cached is None:
+                logging.warning(f"Not in page cache: {url}")
+                return None
+            return CachedPage(200, cached[1], True, {})
+
+        headers = {}
+        if cached is not None:
+            meta, body = cached
+            if time.time() - meta['fetched_at'] < self.ttl:
+                return CachedPage(200, body, True, {})
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = session.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached is not None:
+            logging.debug("Not modified: %s", url)
+            self._touch_meta(url, meta)
+            return CachedPage(200, body, True, {})
+        if response.status_code == 200:
+            self.store(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return CachedPage(response.status_code, response.text, False, response.headers)
+
+    def iter_pages(self):
+        """Yield ``(url, body)`` for every cached page, e.g. to re-parse the corpus."""
+        for body_path, meta_path in self._bodies():
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as file:
+                    url = json.load(file)['url']
+                with open(body_path, 'r', encoding='utf-8') as file:
+                    yield url, file.read()
+            except (OSError, ValueError, KeyError):
+                continue
+
+
+def add_cache_arguments(parser):
+    parser.add_argument('--cache-dir', default='page_cache', help="Directory of the on-disk page cache")
+    parser.add_argument('--no-cache', action='store_true', help="Always fetch pages from the website")
+    parser.add_argument('--offline', action='store_true', help="Only replay pages from the cache, never hit the network")
+    parser.add_argument('--cache-ttl', type=float, default=24.0, help="Hours before a cached page is revalidated")
+    parser.add_argument('--cache-max-mb', type=float, default=500.0, help="Size cap of the page cache in MB")
+
+
+def cache_from_args(args):
+    if args.no_cache:
+        return None
+    return PageCache(
+        args.cache_dir,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        ttl=args.cache_ttl * 3600,
+        offline=args.offline,
+    )
@@ -0,0 +1,83 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from async_engine import scrape_all
+from metrics import metrics
+from portrait_parser import parse_portrait_html
+from rate_control import TransientError
+
+_DONE = object()
+
+
+def _timed(parse, html):
+    start = time.perf_counter()
+    return parse(html), time.perf_counter() - start
+
+
+def run_pipeline(fetch_html, items, on_result, parse=parse_portrait_html, parsers=None, max_pending=32, **fetch_options):
+    """Fetch pages and parse them in separate stages that overlap.
+
+    ``fetch_html(item)`` returns a page's raw HTML (or None) and runs through
+    async_engine.scrape_all with ``fetch_options`` (concurrency, rate, ...).
+    The pages go through a queue of at most ``max_pending`` entries to a pool
+    of ``parsers`` processes running ``parse``. A full queue blocks the
+    fetchers and at most ``max_pending`` pages are being parsed at a time,
+    so memory stays bounded. ``on_result(item, record)`` is called for every
+    item as its record is ready.
+    """
+    parsers = parsers or os.cpu_count() or 1
+    pages = queue.Queue(maxsize=max_pending)
+    in_flight = threading.BoundedSemaphore(max_pending)
+
+    def fetch(item):
+        try:
+            html = fetch_html(item)
+        except TransientError:
+            # Retried by scrape_all; gave_up() reports the item if that fails for good
+            raise
+        except Exception as e:
+            logging.error(f"Error fetching {item}: {e}")
+            html = None
+        pages.put((item, html))
+        return True
+
+    def gave_up(item, fetched):
+        if not fetched:
+            pages.put((item, None))
+
+    def finish(item, future):
+        in_flight.release()
+        try:
+            record, seconds = future.result()
+            # Timed in the parser process, recorded here
+            metrics.observe('parse', seconds)
+        except Exception as e:
+            logging.error(f"Error parsing {item}: {e}")
+            record = None
+        on_result(item, record)
+
+    def consume(executor):
+        while True:
+            entry = pages.get()
+            if entry is _DONE:
+                return
+            item, html = entry
+            if html is None:
+                on_result(item, None)
+                continue
+            in_flight.acquire()
+            future = executor.submit(_timed, parse, html)
+            future.add_done_callback(lambda future, item=item: finish(item, future))
+
+    with ProcessPoolExecutor(max_workers=parsers) as executor:
+        consumer = threading.Thread(target=consume, args=(executor,), name="parse-stage")
+        consumer.start()
+        try:
+            scrape_all(fetch, items, on_result=gave_up, collect=False, **fetch_options)
+        finally:
+            pages.put(_DONE)
+            consumer.join()
@@ -0,0 +1,86 @@
+import hashlib
+import json
+import logging
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+PLOT_DPI = 300
+PREVIEW_DPI = 72
+
+# ``series`` holds the bar heights (kind 'bar') or the raw numbers (kind 'hist')
+PlotJob = namedtuple('PlotJob', ['filename', 'category', 'kind', 'series', 'dpi'])
+
+
+def add_value_labels(ax, spacing=5):
+    for rect in ax.patches:
+        y_value = rect.get_height()
+        x_value = rect.get_x() + rect.get_width() / 2
+        label = f"{int(y_value)}"
+        ax.annotate(label, (x_value, y_value), xytext=(0, spacing),
+                    textcoords="offset points", ha='center', va='bottom')
+
+
+def job_hash(job):
+    """Hash of everything that ends up in the image: the data and the plot settings."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([job.category, job.kind, job.dpi]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(job.series.astype(str), index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def render(job):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(14, 8))
+    if job.kind == 'bar':
+        job.series.plot(kind='bar', ax=ax)
+        add_value_labels(ax)
+        ax.set_ylabel("Count")
+    else:
+        job.series.hist(bins=20, ax=ax)
+        ax.set_ylabel("Frequency")
+    ax.set_title(f"Distribution of {job.category}")
+    ax.set_xlabel(job.category)
+
+    plt.xticks(rotation=45, ha='right')
+    plt.tight_layout()
+    plt.savefig(job.filename, dpi=job.dpi, bbox_inches='tight')
+    plt.close(fig)
+    return job.filename
+
+
+def render_plots(jobs, manifest_path='plot_manifest.json', workers=None, force=False):
+    """Render ``jobs`` in a process pool, skipping plots that are up to date.
+
+    A plot is up to date if its file exists and the hash of its data and
+    settings matches the one recorded in ``manifest_path`` by the last run.
+    Returns the filenames that were rendered.
+    """
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            manifest = json.load(file)
+
+    hashes = {job.filename: job_hash(job) for job in jobs}
+    stale = [
+        job for job in jobs
+        if force or manifest.get(job.filename) != hashes[job.filename] or not os.path.exists(job.filename)
+    ]
+    if len(stale) < len(jobs):
+        logging.info(f"{len(jobs) - len(stale)} plots are unchanged and were skipped")
+
+    rendered = []
+    if stale:
+        with ProcessPoolExecutor(max_workers=workers or min(len(stale), os.cpu_count() or 1)) as executor:
+            for job, filename in zip(stale, executor.map(render, stale)):
+                manifest[job.filename] = hashes[job.filename]
+                rendered.append(filename)
+
+    with open(manifest_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=1)
+    return rendered
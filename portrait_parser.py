@@ -0,0 +1,199 @@
+import itertools
+import logging
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+from metrics import metrics
+
+PARSER = 'lxml' if lxml is not None else 'html.parser'
+
+# Without lxml only the heading and the portrait table are turned into a
+# tree; navigation, teasers, scripts and footer are skipped
+PORTRAIT_STRAINER = SoupStrainer(['h1', 'tbody'])
+LINK_STRAINER = SoupStrainer('a', href=True)
+
+# The extracted fields are logged for one record in FIELD_LOG_EVERY
+FIELD_LOG_EVERY = 50
+_records = itertools.count()
+
+
+# Text in these never shows up in BeautifulSoup's get_text(); lxml's
+# text_content() would include it
+NON_TEXT_TAGS = ('script', 'style', 'template')
+
+
+def _extract_lxml(page_source):
+    document = lxml.html.document_fromstring(page_source)
+    heading = document.find('.//h1')
+    table = document.find('.//tbody')
+    for element in (heading, table):
+        if element is not None:
+            lxml.etree.strip_elements(element, *NON_TEXT_TAGS, with_tail=False)
+    name = heading.text_content() if heading is not None else None
+    if table is None:
+        return name, None
+    rows = []
+    for row in table.iter('tr'):
+        th = row.find('.//th')
+        td = row.find('.//td')
+        if th is not None and td is not None:
+            rows.append((th.text_content(), td.text_content()))
+    return name, rows
+
+
+def _extract_soup(page_source):
+    soup = BeautifulSoup(page_source, 'html.parser', parse_only=PORTRAIT_STRAINER)
+    heading = soup.find('h1')
+    table = soup.find('tbody')
+    name = heading.text if heading else None
+    if table is None:
+        return name, None
+    rows = []
+    for row in table.find_all('tr'):
+        th = row.find('th')
+        td = row.find('td')
+        if th and td:
+            rows.append((th.text, td.text))
+    return name, rows
+
+
+def _build_record(name, rows):
+    data = {'Name': name.strip() if name is not None else 'N/A'}
+
+    if rows is not None:
+        for key, value in rows:
+            data[key.strip()] = value.strip()
+        # One structured line for a sample of the records instead of a
+        # formatted line per field of every record
+        if next(_records) % FIELD_LOG_EVERY == 0:
+            logging.debug("Extracted %d fields of %s: %r", len(data) - 1, data['Name'], data)
+    else:
+        logging.warning("Table not found on the page")
+
+    return data
+
+
+def _extract(page_source):
+    if lxml is not None:
+        try:
+            return _extract_lxml(page_source)
+        except (ValueError, lxml.etree.ParserError):
+            # Empty documents and strings with an XML encoding declaration
+            pass
+    return _extract_soup(page_source)
+
+
+def parse_portrait_html(page_source, require_table=False):
+    """Extract the name and the portrait table of a portrait page.
+
+    Returns None instead of a name-only record when ``require_table`` is set
+    and the page has no ``<tbody>`` (e.g. because it is rendered client-side).
+    Uses lxml when it is installed and BeautifulSoup otherwise; both leave
+    out the text of scripts, styles and templates, as a full ``html.parser``
+    tree does (benchmarks/bench_parse.py checks the fixtures for this).
+    """
+    name, rows = _extract(page_source)
+
+    if rows is None and require_table:
+        return None
+    return _build_record(name, rows)
+
+
+# Runs in the browser and reads the same heading and table cells from the live
+# DOM. Stripping happens in Python so the results match parse_portrait_html.
+EXTRACT_PORTRAIT_SCRIPT = """
+const heading = document.querySelector('h1');
+const table = document.querySelector('tbody');
+if (!table) {
+    return null;
+}
+// textContent includes scripts and styles, which parse_portrait_html leaves out
+const text = node => {
+    if (!node.querySelector('script, style, template')) {
+        return node.textContent;
+    }
+    const copy = node.cloneNode(true);
+    copy.querySelectorAll('script, style, template').forEach(element => element.remove());
+    return copy.textContent;
+};
+const rows = [];
+for (const row of table.querySelectorAll('tr')) {
+    const th = row.querySelector('th');
+    const td = row.querySelector('td');
+    if (th && td) {
+        rows.push([text(th), text(td)]);
+    }
+}
+return {
+    name: heading ? text(heading) : null,
+    rows: rows,
+    html: arguments[0] ? (heading ? heading.outerHTML : '') + '<table>' + table.outerHTML + '</table>' : null,
+};
+"""
+
+
+def extract_portrait(driver, with_html=False):
+    """Extract a portrait straight from the live DOM with one script call.
+
+    Returns ``(data, html)``, where ``html`` is a compact snapshot of just the
+    heading and table (only with ``with_html``) that parse_portrait_html turns
+    into the same record, or None when the page has no portrait table.
+    """
+    result = driver.execute_script(EXTRACT_PORTRAIT_SCRIPT, with_html)
+    if not result:
+        return None
+    return _build_record(result['name'], result['rows']), result['html']
+
+
+def read_portrait(driver, url, cache=None):
+    """Read the portrait on the driver's current page.
+
+    Tries extract_portrait first and only falls back to transferring
+    ``page_source`` and parsing it when the script finds no table or fails.
+    With a ``cache`` the compact snapshot (or the full page) is stored under ``url``.
+    """
+    try:
+        with metrics.timer('extract'):
+            extracted = extract_portrait(driver, with_html=cache is not None)
+    except Exception as e:
+        logging.debug("In-browser extraction failed on %s: %s", url, e)
+        extracted = None
+
+    if extracted is not None:
+        data, html = extracted
+        if cache is not None:
+            cache.store(url, html)
+        return data
+
+    with metrics.timer('page_source'):
+        page_source = driver.page_source
+    logging.debug("Page source length: %d", len(page_source))
+    if cache is not None:
+        cache.store(url, page_source)
+    with metrics.timer('parse'):
+        return parse_portrait_html(page_source)
+
+
+def parse_portrait_links(page_source):
+    hrefs = None
+    if lxml is not None:
+        try:
+            document = lxml.html.document_fromstring(page_source)
+            hrefs = [link.get('href') for link in document.iter('a') if 'portraet' in link.get('href', '')]
+        except (ValueError, lxml.etree.ParserError):
+            pass
+    if hrefs is None:
+        soup = BeautifulSoup(page_source, 'html.parser', parse_only=LINK_STRAINER)
+        hrefs = [link['href'] for link in soup.find_all('a') if 'portraet' in link['href']]
+    logging.debug(f"Found {len(hrefs)} potential portrait links")
+
+    # Every wrestler is linked twice (name and "Name - Portrait")
+    portrait_links = list(dict.fromkeys(href for href in hrefs if href != '/portraet'))
+    logging.debug(f"Filtered to {len(portrait_links)} unique portrait links")
+
+    return portrait_links
@@ -0,0 +1,111 @@
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+NUMBER = re.compile(r'\d+(?:[.,]\d+)?')
+LEADING_COUNT = re.compile(r'\s*(\d+)\b')
+# Commas inside parentheses separate names, not entries: "1 Bruder, 1 Schwester (Ivan, Anja)"
+LIST_SEPARATOR = re.compile(r',\s*(?![^()]*\))')
+
+
+def parse_date(value):
+    """'18.08.1992' -> date(1992, 8, 18); None for anything else."""
+    try:
+        return datetime.strptime(value.strip(), '%d.%m.%Y').date()
+    except (AttributeError, ValueError):
+        return None
+
+
+def parse_number(value):
+    """'186' -> 186.0, '48,5' -> 48.5, '46/47' or '46–47' -> 46.5; None for anything else."""
+    if not value:
+        return None
+    numbers = [float(number.replace(',', '.')) for number in NUMBER.findall(value)]
+    if not numbers or len(numbers) > 2 or NUMBER.sub('', value).strip(' -–/') != '':
+        return None
+    return sum(numbers) / len(numbers)
+
+
+def parse_int(value):
+    number = parse_number(value)
+    return round(number) if number is not None else None
+
+
+def split_list(value, separator=LIST_SEPARATOR):
+    """'Schwingen, Ski fahren' -> ('Schwingen', 'Ski fahren'); '' -> ()."""
+    if not value:
+        return ()
+    return tuple(item.strip() for item in re.split(separator, value) if item.strip())
+
+
+def split_jobs(value):
+    """Professions and drinks are separated by slashes: 'Landwirt / Zimmermann'."""
+    return split_list(value, r'/')
+
+
+def parse_count(value):
+    """Number of children or siblings in an entry like '2 (Lina 2017, Alex 2020)'.
+
+    'keine' is 0, entries starting with numbers are summed ('1 Bruder, 2 Schwestern'
+    is 3), otherwise every listed name counts once.
+    """
+    if not value:
+        return None
+    if value.strip().lower().startswith(('kein', 'nein')):
+        return 0
+    entries = split_list(value)
+    counts = [LEADING_COUNT.match(entry) for entry in entries]
+    if all(counts):
+        return sum(int(count.group(1)) for count in counts)
+    return len(entries)
+
+
+@dataclass(slots=True)
+class PortraitRecord:
+    """A portrait with its values parsed once, next to the raw strings.
+
+    ``raw`` is the record exactly as scraped (what the CSV, the journal and
+    the SQLite store keep); the other fields are None or empty when a value
+    is missing or cannot be parsed.
+    """
+
+    name: str
+    geburtsdatum: date | None = None
+    groesse_cm: int | None = None
+    gewicht_kg: int | None = None
+    schuhgroesse: float | None = None
+    wohnort: str | None = None
+    zivilstand: str | None = None
+    kinder: int | None = None
+    geschwister: int | None = None
+    jetziger_beruf: tuple = ()
+    erlernter_beruf: tuple = ()
+    lieblingsgetraenk: tuple = ()
+    hobbys: tuple = ()
+    raw: dict = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            name=data.get('Name', 'N/A'),
+            geburtsdatum=parse_date(data.get('Geburtsdatum')),
+            groesse_cm=parse_int(data.get('Grösse (cm)')),
+            gewicht_kg=parse_int(data.get('Gewicht (kg)')),
+            schuhgroesse=parse_number(data.get('Schuhgrösse')),
+            wohnort=data.get('Wohnort') or None,
+            zivilstand=data.get('Zivilstand') or None,
+            kinder=parse_count(data.get('Kinder')),
+            geschwister=parse_count(data.get('Geschwister')),
+            jetziger_beruf=split_jobs(data.get('jetziger Beruf')),
+            erlernter_beruf=split_jobs(data.get('erlernter Beruf')),
+            lieblingsgetraenk=split_jobs(data.get('Lieblingsgetränk')),
+            hobbys=split_list(data.get('Hobbys')),
+            raw=data,
+        )
+
+    def age(self, on=None):
+        if self.geburtsdatum is None:
+            return None
+        on = on or date.today()
+        born = self.geburtsdatum
+        return on.year - born.year - ((on.month, on.day) < (born.month, born.day))
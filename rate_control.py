@@ -0,0 +1,124 @@
+import logging
+import random
+import threading
+import time
+from collections import Counter
+
+
+class TransientError(Exception):
+    """A failure worth retrying: a timeout, a dropped connection, HTTP 429 or 5xx.
+
+    ``status`` is the HTTP status if there was a response; ``retry_after``
+    the delay in seconds the server asked for, if any.
+    """
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def retry_after_seconds(response):
+    value = response.headers.get('Retry-After')
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        # An HTTP date; the backoff delay is used instead
+        return None
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0, retry_after=None):
+    """Capped exponential backoff with full jitter, at least ``retry_after``."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, min(cap, retry_after))
+    return delay
+
+
+class AdaptiveController:
+    """AIMD control of request rate and concurrency.
+
+    Every successful response raises the rate by ``increase`` per second and,
+    once per ``limit`` successes, the concurrency by one, up to ``max_rate``
+    and ``max_concurrency``. A timeout, a 429/5xx response or a latency above
+    ``latency_factor`` times the best observed one halves both (``decrease``),
+    at most once per ``cooldown`` seconds so one burst of failures counts once.
+    """
+
+    def __init__(self, rate, max_concurrency, max_rate=None, min_rate=0.1, increase=0.05, decrease=0.5,
+                 latency_factor=2.0, cooldown=5.0):
+        self.rate = rate
+        self.limit = max_concurrency
+        self.max_rate = max_rate or rate * 4
+        self.max_concurrency = max_concurrency
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.latency = None
+        self.baseline = None
+        self.successes = 0
+        self.last_decrease = float('-inf')
+        self.decisions = Counter()
+        self.lock = threading.Lock()
+
+    def attach(self, session):
+        """Observe every response of a requests session."""
+        session.hooks['response'].append(self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        if response.status_code == 429 or response.status_code >= 500:
+            self.failure(f"HTTP {response.status_code}")
+        else:
+            self.success(response.elapsed.total_seconds())
+
+    def success(self, latency):
+        with self.lock:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            # The baseline follows lasting latency changes only slowly
+            if self.baseline is None or self.latency < self.baseline:
+                self.baseline = self.latency
+            else:
+                self.baseline += (self.latency - self.baseline) * 0.01
+            if self.latency > self.baseline * self.latency_factor:
+                self._decrease(f"latency {self.latency:.2f}s (best {self.baseline:.2f}s)")
+                return
+
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            self.successes += 1
+            if self.successes >= self.limit and self.limit < self.max_concurrency:
+                self.successes = 0
+                self.limit += 1
+                self.decisions['increase'] += 1
+                logging.debug(f"Rate control: speeding up to {self.rate:.2f}/s, concurrency {self.limit}")
+
+    def failure(self, reason):
+        with self.lock:
+            self._decrease(reason)
+
+    def retried(self):
+        with self.lock:
+            self.decisions['retry'] += 1
+
+    def _decrease(self, reason):
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.successes = 0
+        old_rate, old_limit = self.rate, self.limit
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.limit = max(1, int(self.limit * self.decrease))
+        self.decisions['decrease'] += 1
+        logging.warning(
+            f"Rate control: {reason}, slowing down from {old_rate:.2f}/s to {self.rate:.2f}/s, "
+            f"concurrency {old_limit} -> {self.limit}"
+        )
+
+    def report(self):
+        logging.info(
+            f"Rate control: ended at {self.rate:.2f}/s and concurrency {self.limit} after "
+            f"{self.decisions['increase']} increases, {self.decisions['decrease']} decreases "
+            f"and {self.decisions['retry']} retries"
+        )
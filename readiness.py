@@ -0,0 +1,72 @@
+import time
+from enum import Enum
+from urllib.parse import urlsplit
+
+# Everything needed to classify the current page, in one round-trip
+READINESS_SCRIPT = """
+const navigation = performance.getEntriesByType('navigation')[0];
+const alert = document.querySelector('.alert-danger');
+const content = document.querySelector('main') || document.body;
+return {
+    status: (navigation && navigation.responseStatus) || 0,
+    complete: document.readyState === 'complete',
+    table: document.querySelector('tbody') !== null,
+    alert: alert ? alert.textContent : '',
+    title: document.title,
+    path: location.pathname,
+    empty: !content || content.textContent.trim().length === 0,
+};
+"""
+
+NOT_FOUND_TEXT = "Seite nicht gefunden"
+LISTING_PATH = '/portraet'
+
+
+class Outcome(Enum):
+    FOUND = 'found'
+    NOT_FOUND = 'not-found'
+    TRANSIENT = 'transient'
+
+
+def classify(state, url):
+    """Return ``(Outcome, reason)`` for a page state, or None while it is undecided."""
+    if state['table']:
+        return Outcome.FOUND, 'table'
+    if NOT_FOUND_TEXT in state['alert'] or NOT_FOUND_TEXT in state['title'] or '404' in state['title']:
+        return Outcome.NOT_FOUND, 'not-found page'
+    if state['status'] in (404, 410):
+        return Outcome.NOT_FOUND, f"HTTP {state['status']}"
+    if state['status'] == 429 or state['status'] >= 500:
+        return Outcome.TRANSIENT, f"HTTP {state['status']}"
+    requested = urlsplit(url).path.rstrip('/')
+    if state['path'].rstrip('/') == LISTING_PATH and requested != LISTING_PATH:
+        return Outcome.NOT_FOUND, 'redirected to listing'
+    return None
+
+
+def wait_for_portrait(driver, url, budget=15, settle=3, poll=0.25):
+    """Poll the freshly loaded page until it is a portrait or clearly is not one.
+
+    Returns ``(Outcome, reason)`` within ``budget`` seconds. A fully loaded
+    page whose content container stays empty for ``settle`` seconds counts
+    as not found; running out of budget is a transient failure.
+    """
+    deadline = time.monotonic() + budget
+    empty_since = None
+    while True:
+        state = driver.execute_script(READINESS_SCRIPT)
+        result = classify(state, url)
+        if result is not None:
+            return result
+
+        now = time.monotonic()
+        if state['complete'] and state['empty']:
+            empty_since = empty_since or now
+            if now - empty_since >= settle:
+                return Outcome.NOT_FOUND, 'empty content'
+        else:
+            empty_since = None
+
+        if now >= deadline:
+            return Outcome.TRANSIENT, f"not ready after {budget}s"
+        time.sleep(poll)
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+import threading
+import time
+
+
+class RunJournal:
+    """Append-only JSONL log of every scraped URL or name.
+
+    Each outcome is written as one line and flushed to disk immediately, so a
+    crashed run can be resumed: ``succeeded()`` returns the keys that do not
+    have to be scraped again and ``iter_succeeded()`` streams their records.
+    A new run without ``resume`` moves an existing journal to ``<path>.1``
+    instead of overwriting it.
+    """
+
+    def __init__(self, path='schlussgang_run.jsonl', resume=False):
+        self.path = path
+        self.lock = threading.Lock()
+        if not resume and os.path.exists(path) and os.path.getsize(path) > 0:
+            os.replace(path, f"{path}.1")
+            logging.warning(f"Moved the journal of the previous run to {path}.1 (use --resume to continue it)")
+        self.done = self._load() if resume else set()
+        if resume:
+            logging.info(f"Resuming run from {path}: {len(self.done)} already scraped")
+        self.file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        if resume and self.file.tell() > 0:
+            # Terminate a torn last line so the next record starts on its own line
+            with open(path, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n':
+                    self.file.write('\n')
+
+    def _load(self):
+        done = set()
+        for key, status, data in self._entries():
+            if status == 'ok':
+                done.add(key)
+            else:
+                done.discard(key)
+        return done
+
+    def _entries(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A crash can leave a torn last line behind
+                    logging.warning(f"Skipping unreadable journal line in {self.path}")
+                    continue
+                yield entry['key'], entry.get('status'), entry.get('data')
+
+    def succeeded(self):
+        """Keys that were scraped successfully, in this run or a resumed one."""
+        return set(self.done)
+
+    def iter_succeeded(self):
+        """Stream ``(key, record)`` of earlier successes back from disk."""
+        seen = set()
+        for key, status, data in self._entries():
+            if status == 'ok' and key in self.done and key not in seen:
+                seen.add(key)
+                yield key, data
+
+    def record(self, key, data):
+        entry = {'key': key, 'status': 'ok' if data else 'failed', 'data': data, 'time': time.time()}
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            if data:
+                self.done.add(key)
+
+    def close(self):
+        self.file.close()
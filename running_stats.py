@@ -0,0 +1,271 @@
+import argparse
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+from collections import Counter
+
+from portrait_record import PortraitRecord
+
+# Record attributes counted exactly, attribute -> label
+COUNTED_FIELDS = {
+    'wohnort': 'Wohnort',
+    'zivilstand': 'Zivilstand',
+    'kinder': 'Kinder',
+    'geschwister': 'Geschwister',
+    'lieblingsgetraenk': 'Lieblingsgetränk',
+}
+# Numeric attributes with their histogram bin width
+NUMERIC_FIELDS = {
+    'groesse_cm': ('Grösse (cm)', 5),
+    'gewicht_kg': ('Gewicht (kg)', 5),
+    'schuhgroesse': ('Schuhgrösse', 1),
+}
+# Attributes with many distinct values, kept as heavy-hitters sketches
+SKETCHED_FIELDS = {
+    'jetziger_beruf': 'jetziger Beruf',
+    'erlernter_beruf': 'erlernter Beruf',
+}
+
+
+class Welford:
+    """Running count, mean and variance; two of them merge exactly."""
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        count = self.count + other.count
+        if not count:
+            return
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else None
+
+    def to_dict(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2}
+
+
+class Histogram:
+    """Counts per bin of ``width``; a bin is named by its lower edge."""
+
+    def __init__(self, width, bins=None):
+        self.width = width
+        self.bins = Counter(bins or {})
+
+    def add(self, value):
+        self.bins[math.floor(value / self.width) * self.width] += 1
+
+    def merge(self, other):
+        self.bins.update(other.bins)
+
+    def to_dict(self):
+        return {'width': self.width, 'bins': {str(edge): count for edge, count in sorted(self.bins.items())}}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['width'], {float(edge): count for edge, count in data['bins'].items()})
+
+
+class SpaceSaving:
+    """Heavy-hitters sketch keeping at most ``capacity`` items (Space-Saving).
+
+    Every item with a true count above n / capacity is in the sketch, and
+    ``counts[item] - errors[item]`` is a lower bound of its true count.
+    """
+
+    def __init__(self, capacity=100, counts=None, errors=None):
+        self.capacity = capacity
+        self.counts = dict(counts or {})
+        self.errors = dict(errors or {})
+
+    def add(self, item):
+        if item in self.counts:
+            self.counts[item] += 1
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = 1
+            self.errors[item] = 0
+        else:
+            smallest = min(self.counts, key=self.counts.get)
+            count = self.counts.pop(smallest)
+            self.errors.pop(smallest)
+            self.counts[item] = count + 1
+            self.errors[item] = count
+
+    def merge(self, other):
+        # An item missing from a full sketch may still have occurred up to
+        # that sketch's smallest count times
+        own_floor = min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+        other_floor = min(other.counts.values()) if len(other.counts) >= other.capacity else 0
+        counts, errors = {}, {}
+        for item in self.counts.keys() | other.counts.keys():
+            counts[item] = self.counts.get(item, own_floor) + other.counts.get(item, other_floor)
+            errors[item] = self.errors.get(item, own_floor) + other.errors.get(item, other_floor)
+        top = sorted(counts, key=counts.get, reverse=True)[:self.capacity]
+        self.counts = {item: counts[item] for item in top}
+        self.errors = {item: errors[item] for item in top}
+
+    def top(self, n=15):
+        return sorted(self.counts.items(), key=lambda entry: entry[1], reverse=True)[:n]
+
+    def to_dict(self):
+        return {'capacity': self.capacity, 'counts': self.counts, 'errors': self.errors}
+
+
+class RunningStats:
+    """Aggregates updated record by record while the scrapers run.
+
+    Exact counters for the categorical fields, Welford mean/variance and
+    histograms for height, weight and shoe size, and heavy-hitters sketches
+    for the professions. Aggregates are saved as JSON and two of them (runs,
+    shards, seasons) can be merged without the underlying records.
+    """
+
+    def __init__(self, sketch_capacity=100):
+        self.records = 0
+        self.lock = threading.Lock()
+        self.counters = {field: Counter() for field in COUNTED_FIELDS}
+        self.moments = {field: Welford() for field in NUMERIC_FIELDS}
+        self.histograms = {field: Histogram(width) for field, (_, width) in NUMERIC_FIELDS.items()}
+        self.sketches = {field: SpaceSaving(sketch_capacity) for field in SKETCHED_FIELDS}
+
+    def add(self, record):
+        if not isinstance(record, PortraitRecord):
+            record = PortraitRecord.from_dict(record)
+        with self.lock:
+            self.records += 1
+            for field in COUNTED_FIELDS:
+                value = getattr(record, field)
+                if isinstance(value, tuple):
+                    self.counters[field].update(value)
+                elif value is not None:
+                    self.counters[field][value] += 1
+            for field in NUMERIC_FIELDS:
+                value = getattr(record, field)
+                if value is not None:
+                    self.moments[field].add(value)
+                    self.histograms[field].add(value)
+            for field in SKETCHED_FIELDS:
+                for value in getattr(record, field):
+                    self.sketches[field].add(value)
+
+    def merge(self, other):
+        with self.lock:
+            self.records += other.records
+            for field in COUNTED_FIELDS:
+                self.counters[field].update(other.counters[field])
+            for field in NUMERIC_FIELDS:
+                self.moments[field].merge(other.moments[field])
+                self.histograms[field].merge(other.histograms[field])
+            for field in SKETCHED_FIELDS:
+                self.sketches[field].merge(other.sketches[field])
+        return self
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'records': self.records,
+                # JSON keys are strings; counts of children/siblings are restored as ints
+                'counters': {field: dict(counter) for field, counter in self.counters.items()},
+                'moments': {field: moments.to_dict() for field, moments in self.moments.items()},
+                'histograms': {field: histogram.to_dict() for field, histogram in self.histograms.items()},
+                'sketches': {field: sketch.to_dict() for field, sketch in self.sketches.items()},
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.records = data['records']
+        for field, counts in data['counters'].items():
+            stats.counters[field] = Counter(
+                {int(key) if field in ('kinder', 'geschwister') else key: count for key, count in counts.items()}
+            )
+        for field, moments in data['moments'].items():
+            stats.moments[field] = Welford(**moments)
+        for field, histogram in data['histograms'].items():
+            stats.histograms[field] = Histogram.from_dict(histogram)
+        for field, sketch in data['sketches'].items():
+            stats.sketches[field] = SpaceSaving(**sketch)
+        return stats
+
+    def save(self, path):
+        data = self.to_dict()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.json.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as file:
+            return cls.from_dict(json.load(file))
+
+    def summary(self, top=5):
+        lines = [f"{self.records} portraits"]
+        for field, (label, _) in NUMERIC_FIELDS.items():
+            moments = self.moments[field]
+            if moments.count:
+                std = f" ± {moments.std:.1f}" if moments.std is not None else ''
+                lines.append(f"{label}: {moments.mean:.1f}{std} (n={moments.count})")
+        for field, label in SKETCHED_FIELDS.items():
+            entries = ', '.join(f"{item} ({count})" for item, count in self.sketches[field].top(top))
+            lines.append(f"{label}: {entries}")
+        for field, label in COUNTED_FIELDS.items():
+            entries = ', '.join(f"{item} ({count})" for item, count in self.counters[field].most_common(top))
+            lines.append(f"{label}: {entries}")
+        return '\n'.join(lines)
+
+
+class LiveStats:
+    """RunningStats fed by a scraper, saved to ``path`` every ``every`` records."""
+
+    def __init__(self, path, every=50):
+        self.path = path
+        self.every = every
+        self.stats = RunningStats()
+
+    def add(self, record):
+        self.stats.add(record)
+        if self.stats.records % self.every == 0:
+            self.stats.save(self.path)
+            logging.info(f"Running statistics after {self.stats.records} portraits:\n{self.stats.summary(top=3)}")
+
+    def close(self):
+        if self.stats.records:
+            self.stats.save(self.path)
+            logging.info(f"Running statistics saved to {self.path}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge and show running statistics saved by the scrapers")
+    parser.add_argument('paths', nargs='+', help="Statistics files of runs or shards")
+    parser.add_argument('--output', help="Save the merged statistics to this file")
+    parser.add_argument('--top', type=int, default=15, help="Entries to show per field")
+    args = parser.parse_args(argv)
+
+    merged = RunningStats()
+    for path in args.paths:
+        merged.merge(RunningStats.load(path))
+    print(merged.summary(top=args.top))
+    if args.output:
+        merged.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,24 @@
-import os
-import requests
-from bs4 import BeautifulSoup
-import csv
-import time
+import argparse
 import logging
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
-import urllib.request
+
+from async_engine import scrape_all
+from browser_fetch import fetch_portrait_source, get_portrait_links, scrape_portrait
+from columnar_export import available as columnar_available, csv_to_parquet
+from csv_stream import StreamingCSVWriter
+from driver_pool import DriverPool
+from http_fetch import fetch_portrait_html, get_session, scrape_portrait_http
+from lean_mode import PageWeightTracker
+from metrics import MetricsReporter, metrics
+from next_data import NextDataSource
+from page_cache import add_cache_arguments, cache_from_args
+from pipeline import run_pipeline
+from portrait_record import PortraitRecord
+from rate_control import AdaptiveController
+from run_journal import RunJournal
+from running_stats import LiveStats
+from sqlite_store import PortraitStore
+from webdriver_setup import setup_driver
+from work_queue import WorkQueue, apply_worker_defaults, default_worker_id, drain
 
 # Configure logging to write to a file
 logging.basicConfig(
@@ -28,121 +35,6 @@ formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 console.setFormatter(formatter)
 logging.getLogger('').addHandler(console)
 
-def download_ublock():
-    url = "https://github.com/gorhill/uBlock/releases/download/1.52.2/uBlock0_1.52.2.firefox.signed.xpi"
-    xpi_path = os.path.join(os.getcwd(), "ublock_origin.xpi")
-    urllib.request.urlretrieve(url, xpi_path)
-    return xpi_path
-
-def setup_driver():
-    firefox_options = Options()
-    # firefox_options.add_argument("--headless")  # Uncomment this line to run in headless mode
-    firefox_options.add_argument("--no-sandbox")
-    firefox_options.add_argument("--disable-dev-shm-usage")
-    firefox_options.set_preference("javascript.enabled", True)
-    
-    geckodriver_path = '/opt/homebrew/bin/geckodriver'
-    if not os.path.isfile(geckodriver_path):
-        logging.error(f"GeckoDriver nicht gefunden unter {geckodriver_path}.")
-        return None
-    
-    service = Service(geckodriver_path)
-    
-    try:
-        driver = webdriver.Firefox(options=firefox_options, service=service)
-        driver.set_page_load_timeout(30)
-        
-        # Install uBlock Origin
-        ublock_path = download_ublock()
-        driver.install_addon(ublock_path, temporary=True)
-        logging.info("uBlock Origin installed")
-        
-        return driver
-    except Exception as e:
-        logging.error(f"Fehler beim Erstellen des WebDrivers: {e}")
-        return None
-
-def get_portrait_links(driver, url):
-    try:
-        logging.info(f"Navigating to {url}")
-        driver.get(url)
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        logging.info("Page loaded successfully")
-        
-        # Scroll to load all content
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        while True:
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(5)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
-        
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        links = soup.select("a[href*='portraet']")
-        logging.debug(f"Found {len(links)} potential portrait links")
-        
-        portrait_links = [link['href'] for link in links if link['href'] != '/portraet']
-        logging.debug(f"Filtered to {len(portrait_links)} valid portrait links")
-        
-        return portrait_links
-    except TimeoutException:
-        logging.error("Timeout waiting for page to load")
-        return []
-    except WebDriverException as e:
-        logging.error(f"WebDriver exception: {e}")
-        return []
-    except Exception as e:
-        logging.error(f"Error in get_portrait_links: {e}")
-        return []
-
-def scrape_portrait(driver, url):
-    try:
-        logging.info(f"Scraping portrait: {url}")
-        driver.get(url)
-        
-        WebDriverWait(driver, 45).until(
-            EC.presence_of_element_located((By.TAG_NAME, "tbody"))
-        )
-        
-        logging.debug(f"Current URL after loading: {driver.current_url}")
-        
-        page_source = driver.page_source
-        logging.debug(f"Page source length: {len(page_source)}")
-        
-        soup = BeautifulSoup(page_source, 'html.parser')
-        
-        data = {'Name': soup.select_one('h1').text.strip() if soup.select_one('h1') else 'N/A'}
-        
-        table = soup.select_one('tbody')
-        if table:
-            rows = table.select('tr')
-            for row in rows:
-                th = row.select_one('th')
-                td = row.select_one('td')
-                if th and td:
-                    key = th.text.strip()
-                    value = td.text.strip()
-                    data[key] = value
-                    logging.debug(f"Extracted: {key} - {value}")
-        else:
-            logging.warning("Table not found on the page")
-        
-        logging.info(f"Successfully scraped data for {data.get('Name', 'Unknown')}")
-        return data
-    except TimeoutException:
-        logging.error(f"Timeout waiting for portrait details on {url}")
-        logging.debug(f"Current page source: {driver.page_source[:500]}...")
-        return None
-    except Exception as e:
-        logging.error(f"Error scraping portrait {url}: {e}")
-        logging.debug(f"Current page source: {driver.page_source[:500]}...")
-        return None
-
-
 
 # def scrape_portrait(driver, url):
 #     try:
@@ -228,47 +120,194 @@ def scrape_portrait(driver, url):
 #         return None
 
 def save_to_csv(data, filename):
-    if not data:
-        logging.warning("No data to save")
-        return
+    with StreamingCSVWriter(filename) as writer:
+        for item in data:
+            writer.write(item)
 
-    keys = set()
-    for item in data:
-        keys.update(item.keys())
-    
-    with open(filename, 'w', newline='', encoding='utf-8') as output_file:
-        dict_writer = csv.DictWriter(output_file, fieldnames=list(keys))
-        dict_writer.writeheader()
-        dict_writer.writerows(data)
-    logging.info(f"Data saved to {filename}")
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape all Schlussgang portraits.")
+    parser.add_argument('--base-url', default='https://www.schlussgang.ch', help="Site to scrape, e.g. a local mock site (see benchmarks/mock_site.py)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Portraits fetched at the same time")
+    parser.add_argument('--browsers', type=int, default=2, help="Headless Firefox instances for pages that need a browser")
+    parser.add_argument('--pages-per-browser', type=int, default=200, help="Restart a browser after this many pages")
+    parser.add_argument('--rate', type=float, default=2.0, help="New requests per second; the starting rate unless --fixed-rate")
+    parser.add_argument('--max-rate', type=float, help="Upper limit for the adaptive rate (default: 4 x --rate)")
+    parser.add_argument('--fixed-rate', action='store_true', help="Keep --rate and --concurrency fixed instead of adapting them")
+    parser.add_argument('--retries', type=int, default=3, help="Retries for timeouts, 429 and 5xx responses")
+    parser.add_argument('--output', default='schlussgang_portraits.csv', help="CSV file the portraits are written to")
+    parser.add_argument('--parquet', help="After the run, also write a typed Parquet (or .arrow) file to this path")
+    parser.add_argument('--running-stats', default='schlussgang_stats.json', help="File the running statistics are saved to")
+    parser.add_argument('--stats-every', type=int, default=50, help="Log and save the running statistics every N portraits")
+    parser.add_argument('--metrics', default='schlussgang_metrics.json', help="Timings and counters of the run (JSON, plus Prometheus text as .prom)")
+    parser.add_argument('--metrics-every', type=float, default=60, help="Write and log the metrics every N seconds")
+    parser.add_argument('--sqlite', help="Also upsert every portrait into this SQLite database")
+    parser.add_argument('--journal', default='schlussgang_run.jsonl', help="Journal file every scraped record is appended to")
+    parser.add_argument('--resume', action='store_true', help="Skip everything the journal already has and retry the rest")
+    parser.add_argument('--lean', action='store_true', help="Don't load images, media and fonts in the browser")
+    parser.add_argument('--lean-allow-host', action='append', default=[], help="In lean mode, block every host except these (repeatable)")
+    parser.add_argument('--source', choices=['html', 'json'], default='html',
+                        help="json: read portraits from the site's Next.js page data where it has any, else from the HTML")
+    parser.add_argument('--pipeline', action='store_true', help="Parse pages in a process pool while the next ones are fetched")
+    parser.add_argument('--parsers', type=int, default=None, help="Parser processes in pipeline mode (default: one per CPU)")
+    parser.add_argument('--queue', help="Share the work through this SQLite work queue with other workers (see work_queue.py)")
+    parser.add_argument('--role', choices=['coordinator', 'worker', 'both'], default='both',
+                        help="With --queue: only enqueue (coordinator), only scrape queued items (worker), or both")
+    parser.add_argument('--worker-id', default=default_worker_id(), help="Name of this worker in the queue, also added to its default file names (default: host:pid)")
+    parser.add_argument('--lease', type=float, default=300, help="Seconds a claimed item stays reserved without a renewal")
+    parser.add_argument('--batch', type=int, default=100, help="Items claimed from the queue at a time")
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    apply_worker_defaults(parser, args, ['output', 'journal', 'running_stats', 'metrics'])
+    if args.parquet and not columnar_available():
+        parser.error("--parquet needs pyarrow (pip install pyarrow)")
+    if args.pipeline and args.source == 'json':
+        parser.error("--pipeline parses HTML pages; --source json needs no parse stage")
+    return args
 
-def main():
-    base_url = 'https://www.schlussgang.ch/portraet'
-    driver = setup_driver()
+def enqueue_portraits(args, base_url, cache):
+    """Coordinator of a work queue: put every portrait of the listing into it."""
+    offline = cache is not None and cache.offline
+    portrait_links = []
+    if args.source == 'json':
+        session = get_session()
+        try:
+            portrait_links = NextDataSource(session, args.base_url, cache=cache).get_portrait_links()
+        finally:
+            session.close()
+    if not portrait_links:
+        driver = None if offline else setup_driver(profile=f'{args.profile_prefix}main', lean=args.lean, allowed_hosts=args.lean_allow_host)
+        if not driver and not offline:
+            logging.error("Konnte den WebDriver nicht initialisieren. Beende das Programm.")
+            return
+        try:
+            portrait_links = get_portrait_links(driver, base_url, cache=cache)
+        finally:
+            if driver:
+                driver.quit()
+    logging.info(f"Found {len(portrait_links)} portrait links")
+    queue = WorkQueue(args.queue, lease_seconds=args.lease)
+    try:
+        queue.enqueue(f"{args.base_url.rstrip('/')}{link}" for link in portrait_links)
+        logging.info(f"Queue {args.queue}: {queue.counts()}")
+    finally:
+        queue.close()
+
+def main(argv=None):
+    args = parse_args(argv)
+    base_url = f"{args.base_url.rstrip('/')}/portraet"
+    cache = cache_from_args(args)
+    if args.queue and args.role == 'coordinator':
+        enqueue_portraits(args, base_url, cache)
+        return
+    offline = cache is not None and cache.offline
+    # Queue workers get their URLs from the queue and need no listing; with
+    # page data the listing needs no browser either, unless there is none
+    worker_only = args.queue and args.role == 'worker'
+    json_source = args.source == 'json'
+    driver = None if offline or worker_only or json_source else setup_driver(profile=f'{args.profile_prefix}main', lean=args.lean, allowed_hosts=args.lean_allow_host)
     
-    if not driver:
+    if not driver and not offline and not worker_only and not json_source:
         logging.error("Konnte den WebDriver nicht initialisieren. Beende das Programm.")
         return
     
+    # Portraits are fetched over plain HTTP; the browser is only needed for the
+    # infinite-scroll listing and for pages whose static HTML has no table
+    session = get_session(pool_size=args.concurrency)
+    source = NextDataSource(session, args.base_url, cache=cache) if json_source else None
+    # Rate and concurrency start at --rate/--concurrency and follow the site's responses
+    controller = None if args.fixed_rate else AdaptiveController(args.rate, args.concurrency, max_rate=args.max_rate)
+    if controller is not None:
+        controller.attach(session)
+    queue = WorkQueue(args.queue, lease_seconds=args.lease) if args.queue else None
+    journal = RunJournal(args.journal, resume=args.resume)
+    writer = StreamingCSVWriter(args.output)
+    store = PortraitStore(args.sqlite) if args.sqlite else None
+    live_stats = LiveStats(args.running_stats, every=args.stats_every)
+    reporter = MetricsReporter(metrics, args.metrics, interval=args.metrics_every).start()
+    weights = PageWeightTracker(lean=args.lean)
+    browsers = DriverPool(
+        lambda index: setup_driver(headless=True, profile=f'{args.profile_prefix}worker-{index}', lean=args.lean, allowed_hosts=args.lean_allow_host),
+        # In pipeline mode the browsers only deliver HTML for the parse stage
+        lambda driver, url: (fetch_portrait_source if args.pipeline else scrape_portrait)(driver, url, cache=cache, weights=weights),
+        size=args.browsers,
+        max_pages=args.pages_per_browser,
+    )
+    
     try:
-        portrait_links = get_portrait_links(driver, base_url)
-        logging.info(f"Found {len(portrait_links)} portrait links")
+        if worker_only:
+            todo = []
+        else:
+            portrait_links = source.get_portrait_links() if source is not None else []
+            if not portrait_links:
+                if source is not None and not offline:
+                    logging.info("No portrait links in the page data, scrolling the listing instead")
+                    driver = setup_driver(profile=f'{args.profile_prefix}main', lean=args.lean, allowed_hosts=args.lean_allow_host)
+                portrait_links = get_portrait_links(driver, base_url, cache=cache)
+            logging.info(f"Found {len(portrait_links)} portrait links")
+            
+            if not portrait_links:
+                logging.warning("No portrait links found. The website structure might have changed.")
+                return
+            
+            full_urls = [f"{args.base_url.rstrip('/')}{link}" for link in portrait_links]
+            done = journal.succeeded()
+            todo = [url for url in full_urls if url not in done]
+            if done:
+                logging.info(f"Skipping {len(full_urls) - len(todo)} portraits already in the journal")
+                for url, portrait_data in journal.iter_succeeded():
+                    writer.write(portrait_data)
+                    live_stats.add(portrait_data)
         
-        if not portrait_links:
-            logging.warning("No portrait links found. The website structure might have changed.")
-            return
+        def on_result(url, portrait_data):
+            metrics.count('portraits' if portrait_data else 'failed')
+            with metrics.timer('write'):
+                journal.record(url, portrait_data)
+                if portrait_data:
+                    writer.write(portrait_data)
+                    # Parsed once here; every consumer below gets the typed values
+                    record = PortraitRecord.from_dict(portrait_data)
+                    if store is not None:
+                        store.upsert(url, record)
+                    live_stats.add(record)
+        
+        fallback = None if offline else browsers.scrape
+        # Page data where the site has it, the static HTML table otherwise
+        scrape = source.scrape_portrait if source is not None else scrape_portrait_http
         
-        all_data = []
-        for link in portrait_links:  # portrait_links[:20] -> Limit to first 10 links for testing
-            full_url = f"https://www.schlussgang.ch{link}"
-            portrait_data = scrape_portrait(driver, full_url)
-            if portrait_data:
-                all_data.append(portrait_data)
-            time.sleep(1)  # Delay between requests
+        def run(urls, on_result):
+            if args.pipeline:
+                run_pipeline(
+                    lambda url: fetch_portrait_html(session, url, fallback=fallback, cache=cache),
+                    urls,
+                    on_result,
+                    parsers=args.parsers,
+                    concurrency=args.concurrency,
+                    rate=args.rate,
+                    controller=controller,
+                    retries=args.retries,
+                )
+            else:
+                scrape_all(
+                    lambda url: scrape(session, url, fallback=fallback, cache=cache),
+                    urls,
+                    concurrency=args.concurrency,
+                    rate=args.rate,
+                    controller=controller,
+                    retries=args.retries,
+                    on_result=on_result,
+                    collect=False,
+                )
+        
+        if queue is not None:
+            # Other workers may take part; each URL is scraped by whoever leases it
+            if todo:
+                queue.enqueue(todo)
+            drain(queue, args.worker_id, run, on_result, batch=args.batch)
+        else:
+            run(todo, on_result)
         
-        if all_data:
-            save_to_csv(all_data, 'schlussgang_portraits.csv')
-            logging.info(f"{len(all_data)} portraits have been extracted and saved to 'schlussgang_portraits.csv'")
+        if writer.rows:
+            logging.info(f"{writer.rows} portraits have been extracted and saved to '{args.output}'")
         else:
             logging.warning("No data was extracted. Please check the connection and website structure.")
     
@@ -276,6 +315,21 @@ def main():
         logging.exception(f"Ein Fehler ist aufgetreten: {e}")
     
     finally:
+        weights.report()
+        reporter.stop()
+        if controller is not None:
+            controller.report()
+        writer.close()
+        if args.parquet and writer.rows:
+            csv_to_parquet(args.output, args.parquet)
+        if store is not None:
+            store.close()
+        if queue is not None:
+            queue.close()
+        live_stats.close()
+        journal.close()
+        session.close()
+        browsers.close()
         if driver:
             driver.quit()
 
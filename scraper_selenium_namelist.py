@@ -1,17 +1,25 @@
-import os
-import requests
-from bs4 import BeautifulSoup
-import csv
-import time
+import argparse
 import logging
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException, NoSuchElementException
-import urllib.request
+
+from async_engine import scrape_all
+from browser_fetch import fetch_portrait_source, scrape_portrait
+from columnar_export import available as columnar_available, csv_to_parquet
+from csv_stream import StreamingCSVWriter
+from driver_pool import DriverPool
+from http_fetch import fetch_portrait_html, get_session, scrape_portrait_http
+from lean_mode import PageWeightTracker
+from metrics import MetricsReporter, metrics
+from next_data import NextDataSource
+from page_cache import add_cache_arguments, cache_from_args
+from pipeline import run_pipeline
+from portrait_record import PortraitRecord
+from rate_control import AdaptiveController
+from run_journal import RunJournal
+from running_stats import LiveStats
+from slug_index import SlugIndex, slug_candidates, slug_variants
+from sqlite_store import PortraitStore
+from webdriver_setup import setup_driver
+from work_queue import WorkQueue, apply_worker_defaults, default_worker_id, drain
 
 # Configure logging to write to a file
 logging.basicConfig(
@@ -28,185 +36,210 @@ formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
 console.setFormatter(formatter)
 logging.getLogger('').addHandler(console)
 
-def download_ublock():
-    url = "https://github.com/gorhill/uBlock/releases/download/1.52.2/uBlock0_1.52.2.firefox.signed.xpi"
-    xpi_path = os.path.join(os.getcwd(), "ublock_origin.xpi")
-    urllib.request.urlretrieve(url, xpi_path)
-    return xpi_path
-
-def setup_driver():
-    firefox_options = Options()
-    # firefox_options.add_argument("--headless")  # Uncomment this line to run in headless mode
-    firefox_options.add_argument("--no-sandbox")
-    firefox_options.add_argument("--disable-dev-shm-usage")
-    firefox_options.set_preference("javascript.enabled", True)
-    
-    geckodriver_path = '/opt/homebrew/bin/geckodriver'
-    if not os.path.isfile(geckodriver_path):
-        logging.error(f"GeckoDriver nicht gefunden unter {geckodriver_path}.")
-        return None
-    
-    service = Service(geckodriver_path)
-    
-    try:
-        driver = webdriver.Firefox(options=firefox_options, service=service)
-        driver.set_page_load_timeout(30)
-        
-        # Install uBlock Origin
-        ublock_path = download_ublock()
-        driver.install_addon(ublock_path, temporary=True)
-        logging.info("uBlock Origin installed")
-        
-        return driver
-    except Exception as e:
-        logging.error(f"Fehler beim Erstellen des WebDrivers: {e}")
-        return None
-
 def generate_urls_from_names(names_file):
     base_url = "https://www.schlussgang.ch/portraet/"
     urls = []
     with open(names_file, 'r', encoding='utf-8') as file:
         for name in file:
             name = name.strip().lower().replace(" ", "-")
-            urls.append(f"{base_url}{name}")
-            urls.append(f"{base_url}{name}-0")  # Adding the -0 variant
+            urls.extend(slug_candidates(base_url, name))  # Including the -0 variant
     return urls
 
-def get_portrait_links(driver, url):
-    try:
-        logging.info(f"Navigating to {url}")
-        driver.get(url)
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        logging.info("Page loaded successfully")
-        
-        # Scroll to load all content
-        last_height = driver.execute_script("return document.body.scrollHeight")
-        while True:
-            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(5)
-            new_height = driver.execute_script("return document.body.scrollHeight")
-            if new_height == last_height:
-                break
-            last_height = new_height
-        
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        links = soup.select("a[href*='portraet']")
-        logging.debug(f"Found {len(links)} potential portrait links")
-        
-        portrait_links = [link['href'] for link in links if link['href'] != '/portraet']
-        logging.debug(f"Filtered to {len(portrait_links)} valid portrait links")
-        
-        return portrait_links
-    except TimeoutException:
-        logging.error("Timeout waiting for page to load")
-        return []
-    except WebDriverException as e:
-        logging.error(f"WebDriver exception: {e}")
-        return []
-    except Exception as e:
-        logging.error(f"Error in get_portrait_links: {e}")
-        return []
-
-def scrape_portrait(driver, url):
-    try:
-        logging.info(f"Scraping portrait: {url}")
-        driver.get(url)
-        
-        # Wait for either the table or the "Seite nicht gefunden" message
-        element = WebDriverWait(driver, 45).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "tbody, .alert-danger"))
-        )
-        
-        # Check if we got the "Seite nicht gefunden" message
-        try:
-            error_message = driver.find_element(By.CLASS_NAME, "alert-danger")
-            if "Seite nicht gefunden" in error_message.text:
-                logging.warning(f"Page not found: {url}")
-                return None
-        except NoSuchElementException:
-            pass  # No error message found, continue with scraping
-        
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        
-        data = {'Name': soup.select_one('h1').text.strip() if soup.select_one('h1') else 'N/A'}
-        
-        table = soup.select_one('tbody')
-        if table:
-            rows = table.select('tr')
-            for row in rows:
-                th = row.select_one('th')
-                td = row.select_one('td')
-                if th and td:
-                    key = th.text.strip()
-                    value = td.text.strip()
-                    data[key] = value
-                    logging.debug(f"Extracted: {key} - {value}")
-        else:
-            logging.warning("Table not found on the page")
-        
-        logging.info(f"Successfully scraped data for {data.get('Name', 'Unknown')}")
-        return data
-    except TimeoutException:
-        logging.error(f"Timeout waiting for portrait details on {url}")
+def scrape_name(session, base_url, name, fallback=None, cache=None, slugs=None, fetch=scrape_portrait_http):
+    # fetch_portrait_html as ``fetch`` returns the raw HTML instead of the record
+    if slugs is not None:
+        # The index knows (or probes) which slug variant exists
+        url = slugs.resolve(session, base_url, name, cache=cache)
+        if url is None:
+            return None
+        data = fetch(session, url, fallback=fallback, cache=cache)
+        if data is not None:
+            return data
+        # The remembered URL is no portrait (any more); try the other variant
+        slugs.forget(name)
+        for slug in slug_variants(name):
+            candidate = f"{base_url}{slug}"
+            if candidate != url:
+                data = fetch(session, candidate, fallback=fallback, cache=cache)
+                if data is not None:
+                    slugs.remember(name, slug)
+                    return data
         return None
-    except Exception as e:
-        logging.error(f"Error scraping portrait {url}: {e}")
-        return None
-
-def scrape_name(driver, base_url, name):
+    
     url = f"{base_url}{name}"
-    data = scrape_portrait(driver, url)
+    data = fetch(session, url, fallback=fallback, cache=cache)
     if data is None:
         # If the first attempt failed, try with "-0" suffix
         url_with_suffix = f"{url}-0"
-        data = scrape_portrait(driver, url_with_suffix)
+        data = fetch(session, url_with_suffix, fallback=fallback, cache=cache)
     return data
 
 def save_to_csv(data, filename):
-    if not data:
-        logging.warning("No data to save")
-        return
+    with StreamingCSVWriter(filename) as writer:
+        for item in data:
+            writer.write(item)
 
-    keys = set()
-    for item in data:
-        keys.update(item.keys())
-    
-    sorted_keys = ['Name'] + sorted(key for key in keys if key != 'Name')
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape Schlussgang portraits from a list of names.")
+    parser.add_argument('--names-file', default="namelist_neu_short.txt", help="One name per line")
+    parser.add_argument('--base-url', default='https://www.schlussgang.ch', help="Site to scrape, e.g. a local mock site (see benchmarks/mock_site.py)")
+    parser.add_argument('--concurrency', type=int, default=8, help="Names scraped at the same time")
+    parser.add_argument('--browsers', type=int, default=2, help="Headless Firefox instances for pages that need a browser")
+    parser.add_argument('--pages-per-browser', type=int, default=200, help="Restart a browser after this many pages")
+    parser.add_argument('--rate', type=float, default=2.0, help="New names started per second; the starting rate unless --fixed-rate")
+    parser.add_argument('--max-rate', type=float, help="Upper limit for the adaptive rate (default: 4 x --rate)")
+    parser.add_argument('--fixed-rate', action='store_true', help="Keep --rate and --concurrency fixed instead of adapting them")
+    parser.add_argument('--retries', type=int, default=3, help="Retries for timeouts, 429 and 5xx responses")
+    parser.add_argument('--output', default='schlussgang_portraits.csv', help="CSV file the portraits are written to")
+    parser.add_argument('--parquet', help="After the run, also write a typed Parquet (or .arrow) file to this path")
+    parser.add_argument('--running-stats', default='schlussgang_stats.json', help="File the running statistics are saved to")
+    parser.add_argument('--stats-every', type=int, default=50, help="Log and save the running statistics every N portraits")
+    parser.add_argument('--metrics', default='schlussgang_metrics.json', help="Timings and counters of the run (JSON, plus Prometheus text as .prom)")
+    parser.add_argument('--metrics-every', type=float, default=60, help="Write and log the metrics every N seconds")
+    parser.add_argument('--sqlite', help="Also upsert every portrait into this SQLite database")
+    parser.add_argument('--journal', default='schlussgang_run.jsonl', help="Journal file every scraped record is appended to")
+    parser.add_argument('--resume', action='store_true', help="Skip everything the journal already has and retry the rest")
+    parser.add_argument('--slug-index', default='slug_index.json', help="File remembering which URL each name resolves to")
+    parser.add_argument('--no-slug-index', action='store_true', help="Try both URL variants of every name one after the other")
+    parser.add_argument('--lean', action='store_true', help="Don't load images, media and fonts in the browser")
+    parser.add_argument('--lean-allow-host', action='append', default=[], help="In lean mode, block every host except these (repeatable)")
+    parser.add_argument('--source', choices=['html', 'json'], default='html',
+                        help="json: read portraits from the site's Next.js page data where it has any, else from the HTML")
+    parser.add_argument('--pipeline', action='store_true', help="Parse pages in a process pool while the next ones are fetched")
+    parser.add_argument('--parsers', type=int, default=None, help="Parser processes in pipeline mode (default: one per CPU)")
+    parser.add_argument('--queue', help="Share the work through this SQLite work queue with other workers (see work_queue.py)")
+    parser.add_argument('--role', choices=['coordinator', 'worker', 'both'], default='both',
+                        help="With --queue: only enqueue (coordinator), only scrape queued items (worker), or both")
+    parser.add_argument('--worker-id', default=default_worker_id(), help="Name of this worker in the queue, also added to its default file names (default: host:pid)")
+    parser.add_argument('--lease', type=float, default=300, help="Seconds a claimed item stays reserved without a renewal")
+    parser.add_argument('--batch', type=int, default=100, help="Items claimed from the queue at a time")
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    apply_worker_defaults(parser, args, ['output', 'journal', 'running_stats', 'metrics', 'slug_index'])
+    if args.parquet and not columnar_available():
+        parser.error("--parquet needs pyarrow (pip install pyarrow)")
+    if args.pipeline and args.source == 'json':
+        parser.error("--pipeline parses HTML pages; --source json needs no parse stage")
+    return args
 
-    with open(filename, 'w', newline='', encoding='utf-8') as output_file:
-        dict_writer = csv.DictWriter(output_file, fieldnames=sorted_keys)
-        dict_writer.writeheader()
-        dict_writer.writerows(data)
-    logging.info(f"Data saved to {filename}")
-    logging.debug(f"CSV columns: {sorted_keys}")
+def read_names(names_file):
+    with open(names_file, 'r', encoding='utf-8') as file:
+        return [name.strip().lower().replace(" ", "-") for name in file if name.strip()]
 
-def main():
-    names_file = "namelist_neu_short.txt"
-    base_url = "https://www.schlussgang.ch/portraet/"
-    driver = setup_driver()
-    
-    if not driver:
-        logging.error("Konnte den WebDriver nicht initialisieren. Beende das Programm.")
+def enqueue_names(args):
+    """Coordinator of a work queue: put every name into it.
+
+    Names rather than URLs are queued, so each worker resolves the slug
+    variant once instead of every variant becoming an item of its own.
+    """
+    queue = WorkQueue(args.queue, lease_seconds=args.lease)
+    try:
+        queue.enqueue(read_names(args.names_file))
+        logging.info(f"Queue {args.queue}: {queue.counts()}")
+    finally:
+        queue.close()
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.queue and args.role == 'coordinator':
+        enqueue_names(args)
         return
+    names_file = args.names_file
+    base_url = f"{args.base_url.rstrip('/')}/portraet/"
+    cache = cache_from_args(args)
+    offline = cache is not None and cache.offline
+    # Every name in flight may probe both slug variants at once
+    session = get_session(pool_size=args.concurrency * 2)
+    source = NextDataSource(session, args.base_url, cache=cache) if args.source == 'json' else None
+    # Probing needs the network, so offline runs replay both cached variants instead
+    slugs = None if args.no_slug_index or offline else SlugIndex(args.slug_index)
+    # Rate and concurrency start at --rate/--concurrency and follow the site's responses
+    controller = None if args.fixed_rate else AdaptiveController(args.rate, args.concurrency, max_rate=args.max_rate)
+    if controller is not None:
+        controller.attach(session)
+    queue = WorkQueue(args.queue, lease_seconds=args.lease) if args.queue else None
+    journal = RunJournal(args.journal, resume=args.resume)
+    writer = StreamingCSVWriter(args.output)
+    store = PortraitStore(args.sqlite) if args.sqlite else None
+    live_stats = LiveStats(args.running_stats, every=args.stats_every)
+    reporter = MetricsReporter(metrics, args.metrics, interval=args.metrics_every).start()
+    weights = PageWeightTracker(lean=args.lean)
+    # Firefox instances are only started once a page turns out to need a browser
+    browsers = DriverPool(
+        lambda index: setup_driver(headless=True, profile=f'{args.profile_prefix}worker-{index}', lean=args.lean, allowed_hosts=args.lean_allow_host),
+        # In pipeline mode the browsers only deliver HTML for the parse stage
+        lambda driver, url: (fetch_portrait_source if args.pipeline else scrape_portrait)(driver, url, cache=cache, weights=weights),
+        size=args.browsers,
+        max_pages=args.pages_per_browser,
+    )
+    
+    def on_result(name, portrait_data):
+        metrics.count('portraits' if portrait_data else 'failed')
+        with metrics.timer('write'):
+            journal.record(name, portrait_data)
+            if portrait_data:
+                writer.write(portrait_data)
+                # Parsed once here; every consumer below gets the typed values
+                record = PortraitRecord.from_dict(portrait_data)
+                if store is not None:
+                    # Keyed by URL like scraper_selenium.py whenever the slug index knows it
+                    store.upsert((slugs and slugs.url_for(base_url, name)) or name, record)
+                live_stats.add(record)
+        if portrait_data:
+            logging.info("Successfully scraped data for %s", portrait_data.get('Name', 'Unknown'))
+        else:
+            logging.warning(f"Failed to scrape data for {name}")
     
     try:
-        all_data = []
-        with open(names_file, 'r', encoding='utf-8') as file:
-            for name in file:
-                name = name.strip().lower().replace(" ", "-")
-                portrait_data = scrape_name(driver, base_url, name)
-                if portrait_data:
-                    all_data.append(portrait_data)
-                    logging.info(f"Successfully scraped data for {portrait_data.get('Name', 'Unknown')}")
-                else:
-                    logging.warning(f"Failed to scrape data for {name}")
-                time.sleep(2)  # Reduced delay between requests
+        # Queue workers get their names from the queue
+        names = [] if args.queue and args.role == 'worker' else read_names(names_file)
+        
+        done = journal.succeeded()
+        todo = [name for name in names if name not in done]
+        if done:
+            logging.info(f"Skipping {len(names) - len(todo)} names already in the journal")
+            for name, portrait_data in journal.iter_succeeded():
+                writer.write(portrait_data)
+                live_stats.add(portrait_data)
+        
+        fallback = None if offline else browsers.scrape
+        # Page data where the site has it, the static HTML table otherwise
+        fetch = source.scrape_portrait if source is not None else scrape_portrait_http
+        
+        def run(names, on_result):
+            if args.pipeline:
+                run_pipeline(
+                    lambda name: scrape_name(session, base_url, name, fallback=fallback, cache=cache, slugs=slugs, fetch=fetch_portrait_html),
+                    names,
+                    on_result,
+                    parsers=args.parsers,
+                    concurrency=args.concurrency,
+                    rate=args.rate,
+                    controller=controller,
+                    retries=args.retries,
+                )
+            else:
+                scrape_all(
+                    lambda name: scrape_name(session, base_url, name, fallback=fallback, cache=cache, slugs=slugs, fetch=fetch),
+                    names,
+                    concurrency=args.concurrency,
+                    rate=args.rate,
+                    controller=controller,
+                    retries=args.retries,
+                    on_result=on_result,
+                    collect=False,
+                )
+        
+        if queue is not None:
+            # Other workers may take part; each name is scraped by whoever leases it
+            if todo:
+                queue.enqueue(todo)
+            drain(queue, args.worker_id, run, on_result, batch=args.batch)
+        else:
+            run(todo, on_result)
         
-        if all_data:
-            save_to_csv(all_data, 'schlussgang_portraits.csv')
-            logging.info(f"{len(all_data)} portraits have been extracted and saved to 'schlussgang_portraits.csv'")
+        if writer.rows:
+            logging.info(f"{writer.rows} portraits have been extracted and saved to '{args.output}'")
         else:
             logging.warning("No data was extracted. Please check the connection and website structure.")
     
@@ -214,8 +247,23 @@ def main():
         logging.exception(f"Ein Fehler ist aufgetreten: {e}")
     
     finally:
-        if driver:
-            driver.quit()
+        weights.report()
+        reporter.stop()
+        if controller is not None:
+            controller.report()
+        writer.close()
+        if args.parquet and writer.rows:
+            csv_to_parquet(args.output, args.parquet)
+        if store is not None:
+            store.close()
+        if queue is not None:
+            queue.close()
+        live_stats.close()
+        if slugs is not None:
+            slugs.close()
+        journal.close()
+        session.close()
+        browsers.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
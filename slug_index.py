@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from http_fetch import TBODY_TAG
+from metrics import metrics
+from readiness import NOT_FOUND_TEXT
+
+
+def slug_variants(name):
+    """Slugs a name can live at below ``/portraet/``, in order of preference."""
+    return [name, f"{name}-0"]
+
+
+def slug_candidates(base_url, name):
+    """Portrait URLs a name can live at, in order of preference."""
+    return [f"{base_url}{slug}" for slug in slug_variants(name)]
+
+
+def probe(session, url, timeout=10, cache=None):
+    """Return True if ``url`` is a portrait, False if it is gone and None if unknown.
+
+    A 200 is only trusted once the page shows the portrait table, since the
+    site also answers missing portraits with a "Seite nicht gefunden" page
+    and status 200. With a ``cache`` the page is fetched through it, so
+    scraping the winning URL afterwards reads the body from there instead
+    of downloading it again.
+    """
+    try:
+        response = cache.fetch(session, url, timeout=timeout) if cache is not None else session.get(url, timeout=timeout)
+    except requests.RequestException as e:
+        logging.debug("Probe of %s failed: %s", url, e)
+        return None
+    if response is None:
+        return None
+    if response.status_code in (404, 410):
+        return False
+    if response.status_code != 200:
+        return None
+    page = response.text
+    if TBODY_TAG.search(page):
+        return True
+    # No table in the static HTML: only a browser can tell a real portrait
+    return False if NOT_FOUND_TEXT in page else None
+
+
+class SlugIndex:
+    """Persisted map from names to their portrait slug, including misses.
+
+    Both slug variants of an unknown name are probed at once; the winning slug
+    is remembered until it stops being a portrait (see ``forget``), a name
+    without any portrait for ``miss_ttl`` seconds, so later runs neither
+    probe again nor wait for a 404 page. Slugs rather than URLs are stored,
+    so the index holds for any ``--base-url``. The file is written every
+    ``save_every`` changes and on ``close``.
+    """
+
+    def __init__(self, path='slug_index.json', miss_ttl=30 * 24 * 3600, save_every=50):
+        self.path = path
+        self.miss_ttl = miss_ttl
+        self.save_every = save_every
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.changes = 0
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as file:
+                self.entries = {name: self._upgrade(entry) for name, entry in json.load(file).items()}
+            logging.info(f"Loaded {len(self.entries)} names from slug index {path}")
+
+    @staticmethod
+    def _upgrade(entry):
+        # Indexes written before slugs were stored hold absolute URLs
+        if 'url' not in entry:
+            return entry
+        def slug(url):
+            return url.rstrip('/').rsplit('/', 1)[-1]
+        return {
+            'slug': slug(entry['url']) if entry['url'] else None,
+            'misses': [slug(url) for url in entry.get('misses', [])],
+            'checked_at': entry['checked_at'],
+        }
+
+    def resolve(self, session, base_url, name, cache=None):
+        """Return the portrait URL of ``name`` below ``base_url``, or None if it has none.
+
+        Probes go through ``cache`` if there is one (see ``probe``).
+        """
+        entry = self.entries.get(name)
+        if entry is not None:
+            if entry['slug']:
+                return f"{base_url}{entry['slug']}"
+            if time.time() - entry['checked_at'] < self.miss_ttl:
+                logging.debug("Known miss in slug index: %s", name)
+                return None
+
+        slugs = slug_variants(name)
+        with metrics.timer('slug_probe'), ThreadPoolExecutor(max_workers=len(slugs)) as executor:
+            results = list(executor.map(lambda slug: probe(session, f"{base_url}{slug}", cache=cache), slugs))
+
+        slug = next((slug for slug, found in zip(slugs, results) if found), None)
+        if slug is None and None in results:
+            # A probe failed for another reason than a 404; don't remember that
+            return f"{base_url}{slugs[results.index(None)]}"
+
+        self._update(name, {
+            'slug': slug,
+            'misses': [variant for variant, found in zip(slugs, results) if found is False],
+            'checked_at': time.time(),
+        })
+        if slug is None:
+            logging.warning(f"No portrait found for {name}")
+            return None
+        return f"{base_url}{slug}"
+
+    def remember(self, name, slug):
+        """Record ``slug`` as the portrait of ``name``, e.g. after the other variant failed."""
+        self._update(name, {'slug': slug, 'misses': [], 'checked_at': time.time()})
+
+    def forget(self, name):
+        """Drop ``name`` from the index, e.g. when its URL turned out not to be a portrait."""
+        if name in self.entries:
+            self._update(name, None)
+            logging.info(f"Dropped {name} from the slug index")
+
+    def url_for(self, base_url, name):
+        """The resolved portrait URL of ``name`` below ``base_url`` if the index knows it."""
+        entry = self.entries.get(name)
+        return f"{base_url}{entry['slug']}" if entry and entry['slug'] else None
+
+    def _update(self, name, entry):
+        with self.lock:
+            if entry is None:
+                self.entries.pop(name, None)
+            else:
+                self.entries[name] = entry
+            self.changes += 1
+            if self.changes >= self.save_every:
+                self._save()
+
+    def close(self):
+        with self.lock:
+            if self.changes:
+                self._save()
+
+    def _save(self):
+        self.changes = 0
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.json.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(self.entries, file, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
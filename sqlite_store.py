@@ -0,0 +1,122 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from portrait_record import PortraitRecord
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS portraits (
+    key TEXT PRIMARY KEY,
+    name TEXT,
+    wohnort TEXT,
+    jetziger_beruf TEXT,
+    geburtsdatum TEXT,
+    data TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_portraits_name ON portraits(name);
+CREATE INDEX IF NOT EXISTS idx_portraits_wohnort ON portraits(wohnort);
+CREATE INDEX IF NOT EXISTS idx_portraits_jetziger_beruf ON portraits(jetziger_beruf);
+CREATE INDEX IF NOT EXISTS idx_portraits_geburtsdatum ON portraits(geburtsdatum);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    field TEXT NOT NULL,
+    old_value TEXT,
+    new_value TEXT,
+    changed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_key ON history(key, changed_at);
+"""
+
+
+class PortraitStore:
+    """SQLite store of portraits keyed by portrait URL (or name).
+
+    ``upsert`` inserts new portraits and updates changed ones; every field
+    added, changed or removed by an update is logged to the ``history`` table.
+    """
+
+    def __init__(self, path='schlussgang_portraits.db'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def upsert(self, key, record):
+        """Store a record (a dict or a PortraitRecord); returns False if nothing changed."""
+        if not isinstance(record, PortraitRecord):
+            record = PortraitRecord.from_dict(record)
+        portrait, record = record, record.raw
+        now = time.time()
+        with self.lock, self.connection:
+            row = self.connection.execute('SELECT data FROM portraits WHERE key = ?', (key,)).fetchone()
+            # A new portrait has no history yet; first_seen records when it appeared
+            old = json.loads(row[0]) if row else record
+            changes = [
+                (key, field, old.get(field), record.get(field), now)
+                for field in sorted(old.keys() | record.keys())
+                if old.get(field) != record.get(field)
+            ]
+            if row and not changes:
+                return False
+            self.connection.execute(
+                """
+                INSERT INTO portraits (key, name, wohnort, jetziger_beruf, geburtsdatum, data, first_seen, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    name = excluded.name,
+                    wohnort = excluded.wohnort,
+                    jetziger_beruf = excluded.jetziger_beruf,
+                    geburtsdatum = excluded.geburtsdatum,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    key,
+                    portrait.name,
+                    portrait.wohnort,
+                    record.get('jetziger Beruf'),
+                    portrait.geburtsdatum.isoformat() if portrait.geburtsdatum else None,
+                    json.dumps(record, ensure_ascii=False),
+                    now,
+                    now,
+                ),
+            )
+            self.connection.executemany(
+                'INSERT INTO history (key, field, old_value, new_value, changed_at) VALUES (?, ?, ?, ?, ?)',
+                changes,
+            )
+        if row:
+            logging.debug(f"Updated {len(changes)} fields of {key} in {self.path}")
+        return True
+
+    def get(self, key):
+        row = self.connection.execute('SELECT data FROM portraits WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def history(self, key):
+        return self.connection.execute(
+            'SELECT field, old_value, new_value, changed_at FROM history WHERE key = ? ORDER BY changed_at, id',
+            (key,),
+        ).fetchall()
+
+    def records(self):
+        for (data,) in self.connection.execute('SELECT data FROM portraits ORDER BY name, key'):
+            yield json.loads(data)
+
+    def close(self):
+        self.connection.close()
+
+
+def load_records(path):
+    """All portrait records of a store, e.g. for pandas.DataFrame."""
+    store = PortraitStore(path)
+    try:
+        return list(store.records())
+    finally:
+        store.close()
@@ -1,69 +1,68 @@
+import argparse
 import pandas as pd
-import matplotlib.pyplot as plt
 
-# Read the CSV file
-df = pd.read_csv('schlussgang_portraits_663.csv')
+from columnar_export import NUMERIC_COLUMNS, convert, load_columns
+from plot_render import PLOT_DPI, PREVIEW_DPI, PlotJob, render_plots
+from sqlite_store import load_records
+from stats_engine import MULTI_VALUE_COLUMNS, compute_stats
 
-# Function to generate statistics for categorical data
-def categorical_stats(column):
-    if column in ['jetziger Beruf', 'gelernter Beruf', 'Lieblingsgetränk']:
-        # Split multiple jobs and count each separately
-        all_jobs = [job.strip() for jobs in df[column].dropna() for job in jobs.split('/')]
-        counts = pd.Series(all_jobs).value_counts()
-        percentages = counts / len(all_jobs) * 100
-    else:
-        counts = df[column].value_counts()
-        percentages = df[column].value_counts(normalize=True) * 100
-    
-    stats = pd.concat([counts, percentages], axis=1, keys=['Count', 'Percentage'])
-    stats['Percentage'] = stats['Percentage'].round(2)
-    return stats
+# Columns the statistics are generated for
+categories = ['jetziger Beruf', 'erlernter Beruf', 'Schuhgrösse', 'Lieblingsgetränk', 'Grösse (cm)', 'Gewicht (kg)']
 
-# Function to generate statistics for numerical data
-def numerical_stats(column):
-    stats = df[column].describe()
-    return stats
+def typed_frame(df):
+    # Raw strings in, numbers and dates parsed once with portrait_record, as in the Parquet export
+    return pd.DataFrame({
+        column: pd.Series(convert(column, df[column].tolist()), dtype='float64' if column in NUMERIC_COLUMNS else object)
+        for column in df.columns
+    })
 
-def add_value_labels(ax, spacing=5):
-    for rect in ax.patches:
-        y_value = rect.get_height()
-        x_value = rect.get_x() + rect.get_width() / 2
-        label = f"{int(y_value)}"
-        ax.annotate(label, (x_value, y_value), xytext=(0, spacing),
-                    textcoords="offset points", ha='center', va='bottom')
+def load_data(source):
+    # Parquet/Arrow files are typed already; only the needed columns are read, memory-mapped
+    if source.endswith(('.parquet', '.arrow', '.feather')):
+        return load_columns(source, categories)
+    # SQLite stores are read directly, without exporting them to CSV first
+    if source.endswith(('.db', '.sqlite')):
+        return typed_frame(pd.DataFrame(load_records(source)).fillna(''))
+    return typed_frame(pd.read_csv(source, dtype=str, keep_default_na=False))
 
-# Generate and print statistics for each category
-categories = ['jetziger Beruf', 'erlernter Beruf', 'Schuhgrösse', 'Lieblingsgetränk', 'Grösse (cm)', 'Gewicht (kg)']
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Statistics and plots of the scraped Schlussgang portraits")
+    parser.add_argument('source', nargs='?', default='schlussgang_portraits_663.csv', help="CSV, Parquet/Arrow file or SQLite store")
+    parser.add_argument('--preview', action='store_true', help=f"Render the plots at {PREVIEW_DPI} dpi instead of {PLOT_DPI}")
+    parser.add_argument('--workers', type=int, help="Processes rendering plots (default: one per CPU)")
+    parser.add_argument('--force', action='store_true', help="Render every plot, even if its data is unchanged")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    # Plots are rendered in worker processes, which import this module again
+    args = parse_args(argv)
+
+    # Read the CSV, Parquet/Arrow file or SQLite store given on the command line
+    df = load_data(args.source)
 
-for category in categories:
-    print(f"\nStatistics for {category}:")
-    if df[category].dtype == 'object':
-        print(categorical_stats(category))
-    else:
-        print(numerical_stats(category))
+    # Compute the statistics for all categories at once, then print them
+    results = compute_stats(df, categories)
 
-    # Generate a bar plot for categorical data or a histogram for numerical data
-    fig, ax = plt.subplots(figsize=(14, 8))
-    if df[category].dtype == 'object':
-        if category in ['jetziger Beruf', 'erlernter Beruf', 'Lieblingsgetränk']:
-            all_jobs = [job.strip() for jobs in df[category].dropna() for job in jobs.split('/')]
-            top_15 = pd.Series(all_jobs).value_counts().nlargest(15)
-            top_15.plot(kind='bar', ax=ax)
+    jobs = []
+    for category, stats in results.items():
+        print(f"\nStatistics for {category}:")
+        if stats.kind == 'categorical':
+            print(stats.counts)
         else:
-            df[category].value_counts().plot(kind='bar', ax=ax)
-        add_value_labels(ax)
-        ax.set_title(f"Distribution of {category}")
-        ax.set_xlabel(category)
-        ax.set_ylabel("Count")
-    else:
-        df[category].hist(bins=20, ax=ax)
-        ax.set_title(f"Distribution of {category}")
-        ax.set_xlabel(category)
-        ax.set_ylabel("Frequency")
-    
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    plt.savefig(f"{category.replace(' ', '_')}_distribution.png", dpi=300, bbox_inches='tight')
-    plt.close(fig)
+            print(stats.summary)
+
+        # A bar plot for categorical data or a histogram for numerical data
+        if stats.kind == 'categorical':
+            series = stats.top if category in MULTI_VALUE_COLUMNS else stats.counts['Count']
+            kind = 'bar'
+        else:
+            series = stats.values
+            kind = 'hist'
+        jobs.append(PlotJob(f"{category.replace(' ', '_')}_distribution.png", category, kind, series, PREVIEW_DPI if args.preview else PLOT_DPI))
+
+    # Only plots whose data or settings changed are rendered, in parallel
+    rendered = render_plots(jobs, workers=args.workers, force=args.force)
+    print(f"\n{len(rendered)} plots have been saved as PNG files, {len(jobs) - len(rendered)} were up to date.")
 
-print("\nPlots have been saved as PNG files.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+from collections import namedtuple
+
+import pandas as pd
+
+# Columns holding several values separated by slashes ("Landwirt / Zimmermann")
+MULTI_VALUE_COLUMNS = ['jetziger Beruf', 'erlernter Beruf', 'Lieblingsgetränk']
+
+# ``values`` is what gets plotted: the (exploded) categorical values or the
+# numbers. Categorical columns have ``counts`` (Count/Percentage) and ``top``,
+# numerical columns a ``summary`` (describe()).
+ColumnStats = namedtuple('ColumnStats', ['column', 'kind', 'values', 'counts', 'top', 'summary'])
+
+
+def tokenize(series, separator='/'):
+    """Split a multi-value column into one row per value, as a categorical."""
+    tokens = series.dropna().astype(str).str.split(separator).explode().str.strip()
+    return tokens[tokens != ''].astype('category')
+
+
+def categorical_stats(values, top_n):
+    counts = values.value_counts()
+    counts = counts[counts > 0]
+    stats = pd.concat([counts, counts / len(values) * 100], axis=1, keys=['Count', 'Percentage'])
+    stats['Percentage'] = stats['Percentage'].round(2)
+    return stats, counts.head(top_n)
+
+
+def compute_stats(df, columns, multi_value=MULTI_VALUE_COLUMNS, top_n=15):
+    """Statistics for every column in ``columns`` in one pass over the frame.
+
+    Multi-value columns are split once with vectorized string operations and
+    ``explode``; every categorical column is counted as a categorical dtype.
+    Returns a dict of ColumnStats by column name.
+    """
+    results = {}
+    for column in columns:
+        series = df[column] if column in df.columns else pd.Series(dtype=object, name=column)
+        if pd.api.types.is_numeric_dtype(series):
+            values = series.dropna()
+            results[column] = ColumnStats(column, 'numerical', values, None, None, series.describe())
+            continue
+        if column in multi_value:
+            values = tokenize(series)
+        else:
+            values = series.dropna().astype('category')
+        counts, top = categorical_stats(values, top_n)
+        results[column] = ColumnStats(column, 'categorical', values, counts, top, None)
+    return results
@@ -0,0 +1,124 @@
+import hashlib
+import logging
+import os
+import tempfile
+import time
+import urllib.request
+from selenium import webdriver
+from selenium.webdriver.firefox.options import Options
+from selenium.webdriver.firefox.service import Service
+
+from lean_mode import apply_lean_options
+
+UBLOCK_URL = "https://github.com/gorhill/uBlock/releases/download/1.52.2/uBlock0_1.52.2.firefox.signed.xpi"
+# SHA-256 of the release XPI above (sha256sum uBlock0_1.52.2.firefox.signed.xpi).
+# Every download and every cached copy is checked against it; as long as it is
+# not set, Firefox starts without the add-on rather than with an unverified one
+UBLOCK_SHA256 = None
+GECKODRIVER_PATH = '/opt/homebrew/bin/geckodriver'
+CACHE_DIR = '.webdriver_cache'
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def download_ublock(cache_dir=CACHE_DIR):
+    """Return the path of the uBlock Origin XPI checked against UBLOCK_SHA256, downloading it only once.
+
+    Returns None if no SHA-256 is pinned.
+    """
+    if not UBLOCK_SHA256:
+        logging.error("UBLOCK_SHA256 is not set; starting Firefox without uBlock Origin")
+        return None
+    os.makedirs(cache_dir, exist_ok=True)
+    xpi_path = os.path.join(cache_dir, os.path.basename(UBLOCK_URL))
+
+    if os.path.isfile(xpi_path):
+        if _sha256(xpi_path) == UBLOCK_SHA256:
+            return xpi_path
+        logging.warning(f"Cached uBlock Origin {xpi_path} failed verification, downloading again")
+
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.xpi.tmp')
+    os.close(fd)
+    urllib.request.urlretrieve(UBLOCK_URL, tmp_path)
+    digest = _sha256(tmp_path)
+    if digest != UBLOCK_SHA256:
+        os.remove(tmp_path)
+        raise ValueError(f"uBlock Origin download has SHA-256 {digest}, expected {UBLOCK_SHA256}")
+    os.replace(tmp_path, xpi_path)
+    logging.info(f"uBlock Origin downloaded to {xpi_path}")
+    return xpi_path
+
+
+def setup_driver(headless=False, profile='main', cache_dir=CACHE_DIR, lean=False, allowed_hosts=None):
+    """Start Firefox on a reusable profile directory with uBlock Origin.
+
+    Every concurrently running driver needs its own ``profile`` name. The
+    profile keeps Firefox's caches and the installed add-on between runs, so
+    only the very first start pays for creating it. ``lean`` skips images,
+    media and fonts (see lean_mode.py); with ``allowed_hosts`` every other
+    host is blocked as well.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    firefox_options = Options()
+    if headless:
+        firefox_options.add_argument("--headless")
+    firefox_options.add_argument("--no-sandbox")
+    firefox_options.add_argument("--disable-dev-shm-usage")
+    firefox_options.set_preference("javascript.enabled", True)
+    if lean:
+        apply_lean_options(firefox_options, allowed_hosts)
+        # Preferences end up in the profile, so lean browsers get their own
+        profile += '-lean'
+
+    profile_dir = os.path.abspath(os.path.join(cache_dir, 'profiles', profile))
+    new_profile = not os.path.isdir(profile_dir)
+    os.makedirs(profile_dir, exist_ok=True)
+    firefox_options.add_argument("-profile")
+    firefox_options.add_argument(profile_dir)
+
+    geckodriver_path = GECKODRIVER_PATH
+    if not os.path.isfile(geckodriver_path):
+        logging.error(f"GeckoDriver nicht gefunden unter {geckodriver_path}.")
+        return None
+
+    service = Service(geckodriver_path)
+
+    try:
+        phase = time.perf_counter()
+        ublock_path = download_ublock(cache_dir)
+        timings['ublock'] = time.perf_counter() - phase
+
+        phase = time.perf_counter()
+        driver = webdriver.Firefox(options=firefox_options, service=service)
+        driver.set_page_load_timeout(30)
+        timings['launch'] = time.perf_counter() - phase
+
+        # The add-on is installed permanently into the profile; the marker
+        # records which XPI is in there
+        phase = time.perf_counter()
+        marker = os.path.join(profile_dir, f'.ublock-{UBLOCK_SHA256[:16]}') if ublock_path else None
+        if marker and not os.path.exists(marker):
+            driver.install_addon(ublock_path, temporary=False)
+            open(marker, 'w').close()
+            logging.info("uBlock Origin installed")
+        timings['addon'] = time.perf_counter() - phase
+
+        timings['total'] = time.perf_counter() - started
+        logging.info(
+            f"WebDriver '{profile}' started in {timings['total']:.2f}s "
+            f"({'new' if new_profile else 'reused'} profile; "
+            + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items() if name != 'total')
+            + ")"
+        )
+        return driver
+    except Exception as e:
+        logging.error(f"Fehler beim Erstellen des WebDrivers: {e}")
+        return None
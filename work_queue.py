@@ -0,0 +1,279 @@
+import argparse
+import json
+import logging
+import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+
+from csv_stream import StreamingCSVWriter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    key TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    data TEXT,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_status ON items(status, lease_until);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def apply_worker_defaults(parser, args, paths):
+    """Give every worker of a queue its own files and Firefox profiles.
+
+    With ``--queue``, each option in ``paths`` that was left at its default
+    gets the worker id added (``schlussgang_run.jsonl`` becomes
+    ``schlussgang_run.<worker>.jsonl``), so workers started in the same
+    directory don't overwrite each other's files; ``args.profile_prefix``
+    does the same for the browser profiles.
+    """
+    args.profile_prefix = ''
+    if not args.queue:
+        return
+    worker = re.sub(r'[^\w.-]+', '_', args.worker_id)
+    args.profile_prefix = f"{worker}-"
+    for name in paths:
+        path = getattr(args, name)
+        if path == parser.get_default(name):
+            root, ext = os.path.splitext(path)
+            setattr(args, name, f"{root}.{worker}{ext}")
+
+
+class WorkQueue:
+    """Lease-based work queue of portrait URLs or names in a SQLite file.
+
+    A coordinator ``enqueue``s the items, any number of workers ``claim``
+    them for ``lease_seconds`` and report back with ``complete`` or ``fail``.
+    A lease that runs out (a worker crashed or hangs) puts its item back to
+    ``pending``; an item whose lease ran out ``max_attempts`` times is marked
+    ``failed`` so it can't take down every worker in turn. Only the worker
+    holding the lease can complete an item, so nothing is stored twice.
+    """
+
+    def __init__(self, path='schlussgang_queue.db', lease_seconds=300, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        # Every write starts with BEGIN IMMEDIATE; other processes wait for the lock
+        self.connection = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def _transaction(self, statements):
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                result = statements(self.connection, time.time())
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+            return result
+
+    def enqueue(self, keys):
+        """Add items that are not in the queue yet; returns how many were new."""
+        def insert(connection, now):
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO items (key, enqueued_at, updated_at) VALUES (?, ?, ?)",
+                ((key, now, now) for key in keys),
+            )
+            return connection.total_changes - before
+        added = self._transaction(insert)
+        logging.info(f"Enqueued {added} new items in {self.path}")
+        return added
+
+    def _expire(self, connection, now):
+        connection.execute(
+            "UPDATE items SET status = 'failed', worker = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        requeued = connection.execute(
+            "UPDATE items SET status = 'pending', worker = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE status = 'leased' AND lease_until < ?",
+            (now, now),
+        ).rowcount
+        if requeued:
+            logging.warning(f"Re-queued {requeued} items whose lease ran out")
+        return requeued
+
+    def requeue_expired(self):
+        return self._transaction(self._expire)
+
+    def claim(self, worker, limit=1):
+        """Lease up to ``limit`` pending items to ``worker``; returns their keys."""
+        def lease(connection, now):
+            self._expire(connection, now)
+            keys = [
+                key for (key,) in connection.execute(
+                    "SELECT key FROM items WHERE status = 'pending' ORDER BY enqueued_at, key LIMIT ?", (limit,)
+                )
+            ]
+            connection.executemany(
+                "UPDATE items SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE key = ?",
+                ((worker, now + self.lease_seconds, now, key) for key in keys),
+            )
+            return keys
+        return self._transaction(lease)
+
+    def renew(self, worker, keys):
+        """Extend the leases ``worker`` still holds on ``keys``; returns how many it holds."""
+        def extend(connection, now):
+            return sum(
+                connection.execute(
+                    "UPDATE items SET lease_until = ?, updated_at = ? WHERE key = ? AND worker = ? AND status = 'leased'",
+                    (now + self.lease_seconds, now, key, worker),
+                ).rowcount
+                for key in keys
+            )
+        return self._transaction(extend)
+
+    def _finish(self, worker, key, status, data):
+        def update(connection, now):
+            return connection.execute(
+                "UPDATE items SET status = ?, data = ?, worker = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE key = ? AND worker = ? AND status = 'leased'",
+                (status, data, now, key, worker),
+            ).rowcount
+        if not self._transaction(update):
+            logging.warning(f"Lease on {key} was lost; the result of {worker} is dropped")
+            return False
+        return True
+
+    def complete(self, worker, key, record):
+        return self._finish(worker, key, 'done', json.dumps(record, ensure_ascii=False))
+
+    def fail(self, worker, key):
+        return self._finish(worker, key, 'failed', None)
+
+    def retry_failed(self):
+        """Put every failed item back to pending with a fresh attempt count."""
+        def reset(connection, now):
+            return connection.execute(
+                "UPDATE items SET status = 'pending', attempts = 0, updated_at = ? WHERE status = 'failed'", (now,)
+            ).rowcount
+        return self._transaction(reset)
+
+    def counts(self):
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        with self.lock:
+            counts.update(self.connection.execute('SELECT status, COUNT(*) FROM items GROUP BY status').fetchall())
+        return counts
+
+    def records(self):
+        """Stream ``(key, record)`` of every finished item."""
+        cursor = self.connection.cursor()
+        for key, data in cursor.execute("SELECT key, data FROM items WHERE status = 'done' ORDER BY enqueued_at, key"):
+            yield key, json.loads(data)
+
+    def close(self):
+        self.connection.close()
+
+
+class LeaseKeeper:
+    """Renews the leases of the items a worker is still scraping, every third of the lease time."""
+
+    def __init__(self, queue, worker):
+        self.queue = queue
+        self.worker = worker
+        self.keys = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='lease-keeper', daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.queue.lease_seconds / 3):
+            with self.lock:
+                keys = list(self.keys)
+            if keys:
+                held = self.queue.renew(self.worker, keys)
+                logging.debug("Renewed %d of %d leases", held, len(keys))
+
+    def hold(self, keys):
+        with self.lock:
+            self.keys.update(keys)
+
+    def release(self, key):
+        with self.lock:
+            self.keys.discard(key)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+
+def drain(queue, worker, run, on_result, batch=100, poll=10.0):
+    """Scrape items from ``queue`` until none are left.
+
+    Claims ``batch`` items at a time and hands them to ``run(items,
+    on_result)`` (async_engine.scrape_all or pipeline.run_pipeline); every
+    result goes back into the queue first and only then to ``on_result(item,
+    record)``, so a worker that lost its lease writes nothing. While other
+    workers still hold leases the worker polls every ``poll`` seconds, so it
+    takes over their items if they crash.
+    """
+    keeper = LeaseKeeper(queue, worker).start()
+
+    def finish(key, record):
+        keeper.release(key)
+        held = queue.complete(worker, key, record) if record else queue.fail(worker, key)
+        if held:
+            on_result(key, record)
+
+    try:
+        while True:
+            keys = queue.claim(worker, batch)
+            if keys:
+                logging.info(f"Worker {worker} claimed {len(keys)} items")
+                keeper.hold(keys)
+                run(keys, finish)
+                continue
+            if not queue.counts()['leased']:
+                break
+            time.sleep(poll)
+    finally:
+        keeper.stop()
+    logging.info(f"Queue {queue.path}: {queue.counts()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and export a scraping work queue (see --queue in the scrapers)")
+    parser.add_argument('path', help="Queue database")
+    parser.add_argument('--export', help="Write all finished portraits to this CSV file")
+    parser.add_argument('--retry-failed', action='store_true', help="Put failed items back into the queue")
+    args = parser.parse_args(argv)
+
+    queue = WorkQueue(args.path)
+    try:
+        if args.retry_failed:
+            print(f"Re-queued {queue.retry_failed()} failed items")
+        queue.requeue_expired()
+        print(', '.join(f"{status}: {count}" for status, count in queue.counts().items()))
+        if args.export:
+            with StreamingCSVWriter(args.export) as writer:
+                for key, record in queue.records():
+                    writer.write(record)
+            print(f"{writer.rows} portraits saved to {args.export}")
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()